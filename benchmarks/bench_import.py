@@ -0,0 +1,55 @@
+# ---------- Import time benchmark
+#
+# Times how long a fresh interpreter takes to do a few typical short-lived things with the package (import it, use the enums, load the scrape functions, show the CLI's help), and lists which of the heavy dependencies each one ended up importing. Each case runs several times in a new process and the median is shown. Run from the repo root:
+#
+#   python benchmarks/bench_import.py --runs 15
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+HEAVY = ["asyncio","aiohttp","bs4","lxml","selectolax","logging.handlers"]
+
+# (name, statements to time)
+CASES = [
+    ("import cnw_scraper","import cnw_scraper"),
+    ("enums","from cnw_scraper import Category,Location;Category.ACTORS;Location.ASIA"),
+    ("options","from cnw_scraper import Options;Options.set_http_timeout(total=60)"),
+    ("profiles","from cnw_scraper import Profile,ProfileList"),
+    ("scrape functions","from cnw_scraper import scrape_category,iter_urls"),
+    ("everything","import cnw_scraper;[getattr(cnw_scraper,name) for name in cnw_scraper.__all__]"),
+]
+
+def measure(statements):
+    # Seconds the statements took in a fresh interpreter, and the heavy modules that got imported
+    code = f"import sys,time;start=time.perf_counter();{statements};elapsed=time.perf_counter()-start;print(elapsed);print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable,"-c",code],cwd=ROOT,capture_output=True,text=True,check=True).stdout.splitlines()
+    return float(out[0]),out[1] if len(out) > 1 else ""
+
+def measure_process(argv):
+    # Seconds a whole python process takes to run, interpreter start up included
+    start = time.perf_counter()
+    subprocess.run([sys.executable]+argv,cwd=ROOT,capture_output=True,check=True)
+    return time.perf_counter()-start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark how long the package takes to import in a fresh interpreter.")
+    parser.add_argument("--runs",type=int,default=10,help="Times to run each case (the median is shown).")
+    args = parser.parse_args()
+
+    print(f"{'case':>18} {'median ms':>10} {'min ms':>8}  heavy modules imported")
+    for name,statements in CASES:
+        results = [measure(statements) for _ in range(args.runs)]
+        times = [elapsed*1000 for elapsed,_ in results]
+        print(f"{name:>18} {statistics.median(times):>10.1f} {min(times):>8.1f}  {results[0][1] or '-'}")
+    # Whole processes, next to a bare interpreter to compare against
+    for name,argv in [("python -c pass",["-c","pass"]),("cli --help",["-m","cnw_scraper","--help"])]:
+        times = [measure_process(argv)*1000 for _ in range(args.runs)]
+        print(f"{name:>18} {statistics.median(times):>10.1f} {min(times):>8.1f}  (whole process)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,62 @@
+# ---------- Parse throughput benchmark
+#
+# Parses a corpus of the synthetic profile pages in fixtures/ with different numbers of parse workers and prints how many pages per second each setup gets through. Run from the repo root:
+#
+#   python benchmarks/bench_parse.py --pages 400 --workers 1 2 4 8
+
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+import cnw_scraper.base_functions as bf
+from cnw_scraper.options import Options
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),"fixtures")
+
+def load_corpus(pages):
+    # Repeat the fixture profile pages until there's enough of them
+    saved = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES,"profile_*.html"))):
+        with open(path,encoding="utf-8") as f:
+            saved.append(f.read())
+    if not saved:
+        raise Exception(f"No profile pages found in {FIXTURES}")
+    return [saved[i % len(saved)] for i in range(pages)]
+
+def run(corpus,workers,executor):
+    # Time how long it takes to parse the whole corpus with the given pool setup
+    Options.parse_workers = workers
+    Options.parse_executor = executor
+    bf._get_executor() # Start the pool before the clock does
+    start = time.perf_counter()
+    profiles = asyncio.run(bf.parse_all(bf.profile_parser(),corpus))
+    elapsed = time.perf_counter() - start
+    assert len(profiles) == len(corpus)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure profile parse throughput with different parse pool sizes.")
+    parser.add_argument("--pages",type=int,default=400,help="Number of pages to parse per run.")
+    parser.add_argument("--workers",type=int,nargs="+",default=[1,2,4,os.cpu_count() or 1],help="Pool sizes to try.")
+    parser.add_argument("--executor",choices=["process","thread"],default="process")
+    parser.add_argument("--no-description",action="store_true",help="Skip descriptions while parsing.")
+    args = parser.parse_args()
+
+    Options.include_description = not args.no_description
+    corpus = load_corpus(args.pages)
+    print(f"{len(corpus)} pages, {os.cpu_count()} CPU core(s), {args.executor} pool")
+    baseline = run(corpus,0,args.executor)
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    print(f"{'inline':>8} {baseline:>9.2f} {len(corpus)/baseline:>9.1f} {1:>8.2f}")
+    for workers in sorted(set(w for w in args.workers if w > 0)):
+        elapsed = run(corpus,workers,args.executor)
+        print(f"{workers:>8} {elapsed:>9.2f} {len(corpus)/elapsed:>9.1f} {baseline/elapsed:>8.2f}")
+    bf._shutdown_executor()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# ---------- Parser backend benchmark
+#
+# Prints how many profile pages per second each installed parser backend gets through (tests/test_parsers.py checks that they all get the same data out of them). Run from the repo root:
+#
+#   python benchmarks/bench_parsers.py --pages 200
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+from cnw_scraper import parsers
+from cnw_scraper.base_functions import parse_profile
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),"fixtures")
+
+def load_pages(pattern):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES,pattern))):
+        with open(path,encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+def profile_data(html,include_description,parser):
+    # What parse_profile gets out of a profile page, as plain data that can be compared
+    profile = parse_profile(html,include_description,parser)
+    return dict(profile.stats),profile.description
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the parse throughput of each parser backend.")
+    parser.add_argument("--pages",type=int,default=200,help="Number of profile pages to parse per backend.")
+    parser.add_argument("--no-description",action="store_true",help="Skip descriptions while parsing.")
+    args = parser.parse_args()
+
+    backends = parsers.available_parsers()
+    saved = list(load_pages("profile_*.html").values())
+    corpus = [saved[i % len(saved)] for i in range(args.pages)]
+    print(f"{'parser':>12} {'seconds':>9} {'pages/s':>9}")
+    for backend in reversed(backends):
+        start = time.perf_counter()
+        for html in corpus:
+            profile_data(html,not args.no_description,backend)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:>12} {elapsed:>9.2f} {len(corpus)/elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# ---------- End-to-end scrape benchmark
+#
+# Runs every scrape_* function against the local stand-in server (see server.py) and prints, for each one: how many profiles it got, how long it took, its end-to-end and parse throughput, how long until the first profile came out of its iter_* version, and its peak memory. Nothing goes over the network. Run from the repo root:
+#
+#   python benchmarks/bench_scrape.py --latency 0.02 --category-pages 10
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),".."))
+
+import cnw_scraper as cnw
+import cnw_scraper.base_functions as bf
+from server import StandInServer
+
+def benchmarks(args):
+    # (name, scrape call, matching iter_* call or None)
+    names = [f"person {i}" for i in range(args.names)]+["nobody here"]
+    urls = [f"{cnw.Options._SITE_URL}/richest-celebrities/person-{i}-net-worth/" for i in range(args.urls)]
+    return [
+        ("scrape_category",lambda: cnw.scrape_category(cnw.Category.ACTORS,1,args.category_pages),lambda: cnw.iter_category(cnw.Category.ACTORS,1,args.category_pages)),
+        ("scrape_category_updates",lambda: cnw.scrape_category_updates(cnw.Category.ACTORS,{},max_pages=args.category_pages),None),
+        ("scrape_map",lambda: cnw.scrape_map(cnw.Location.ASIA),lambda: cnw.iter_map(cnw.Location.ASIA)),
+        ("scrape_top",lambda: cnw.scrape_top(),lambda: cnw.iter_top()),
+        ("scrape_names",lambda: cnw.scrape_names(names),lambda: cnw.iter_names(names)),
+        ("scrape_urls",lambda: cnw.scrape_urls(urls),lambda: cnw.iter_urls(urls)),
+        ("scrape_random",lambda: [cnw.scrape_random()],None),
+        ("scrape_sources",lambda: cnw.scrape_sources([cnw.Source.top(),cnw.Source.map(cnw.Location.ASIA),cnw.Source.category(cnw.Category.ACTORS,1,2)]),None),
+    ]
+
+def reset():
+    # Forget everything remembered between calls, so every run starts cold
+    bf._searches.clear()
+    bf._last_pages.clear()
+    bf._breakers.clear()
+    cnw.Metrics.reset()
+
+def run(scrape,first):
+    # Time a scrape, and how long its streaming version takes to hand back the first profile
+    reset()
+    start = time.perf_counter()
+    profiles = scrape()
+    elapsed = time.perf_counter() - start
+    parse = sum(h["sum"] for h in cnw.Metrics.snapshot()["histograms"] if h["labels"].get("stage") == "parse_profile")
+    first_result = None
+    if first:
+        reset()
+        start = time.perf_counter()
+        stream = first()
+        next(stream)
+        first_result = time.perf_counter() - start
+        stream.close()
+    return len(profiles),elapsed,parse,first_result
+
+def peak_memory(scrape):
+    # Highest amount of memory (in MiB) allocated while the scrape runs
+    reset()
+    tracemalloc.start()
+    scrape()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak/2**20
+
+def import_time():
+    # How long a fresh interpreter takes to import the package
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+    code = "import time;start=time.perf_counter();import cnw_scraper;print(time.perf_counter()-start)"
+    return float(subprocess.run([sys.executable,"-c",code],cwd=root,capture_output=True,text=True,check=True).stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every scrape function against a local stand-in for the site.")
+    parser.add_argument("--latency",type=float,default=0.0,help="Seconds every response is held back for.")
+    parser.add_argument("--jitter",type=float,default=0.0,help="Up to this many seconds randomly added to the latency.")
+    parser.add_argument("--errors",type=float,default=0.0,help="Share of requests that get a 500.")
+    parser.add_argument("--throttle",type=float,default=0.0,help="Share of requests that get a 429.")
+    parser.add_argument("--category-pages",type=int,default=10,help="Category pages to scrape (25 profiles each).")
+    parser.add_argument("--names",type=int,default=50,help="Names to search for with scrape_names.")
+    parser.add_argument("--urls",type=int,default=200,help="URLs to get with scrape_urls.")
+    parser.add_argument("--parser",default=cnw.Options.parser,help="Parser backend to use.")
+    parser.add_argument("--no-memory",action="store_true",help="Skip the (slow) peak memory runs.")
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency,jitter=args.jitter,errors=args.errors,throttle=args.throttle,category_pages=args.category_pages) as server:
+        cnw.Options._SITE_URL = server.url
+        cnw.Options.parser = args.parser
+        cnw.Options.retry_backoff = 0.05
+        cnw.Metrics.enabled = True
+        print(f"Stand-in server on {server.url}, latency {args.latency}s, errors {args.errors:.0%}, throttle {args.throttle:.0%}, parser '{args.parser}'")
+        print(f"Import time: {import_time()*1000:.0f} ms")
+        print(f"{'function':>23} {'profiles':>9} {'seconds':>8} {'profiles/s':>11} {'parse/s':>8} {'first (s)':>10} {'peak MiB':>9}")
+        with cnw.Client():
+            for name,scrape,first in benchmarks(args):
+                count,elapsed,parse,first_result = run(scrape,first)
+                memory = "-" if args.no_memory else f"{peak_memory(scrape):.1f}"
+                parse_rate = f"{count/parse:.0f}" if parse else "-"
+                first_text = f"{first_result:.3f}" if first_result is not None else "-"
+                print(f"{name:>23} {count:>9} {elapsed:>8.2f} {count/elapsed:>11.1f} {parse_rate:>8} {first_text:>10} {memory:>9}")
+        print(f"{server.requests} requests served")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# ---------- Local stand-in for the site
+#
+# Serves the synthetic pages in fixtures/ (made-up pages with the site's markup, not recordings of it - see fixtures/README.md) the way the site would, so the scrape functions can be benchmarked without network access (or without hammering the real site). Every profile URL works, category pages go up to a set number of pages (404 after that), and searches find whatever name was searched for (except names starting with 'nobody'). Latency, server errors and throttling can be dialed in to see how the scraper holds up. Point the scraper at it by setting Options._SITE_URL to its url. Run it on its own from the repo root with:
+#
+#   python benchmarks/server.py --port 8765 --latency 0.05 --errors 0.01 --throttle 0.01
+
+import argparse
+import asyncio
+import glob
+import os
+import random
+import re
+import threading
+import time
+
+from aiohttp import web
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),"fixtures")
+SITE_URL = "https://www.celebritynetworth.com"
+_PERSON = re.compile(r"person-(\d+)-net-worth")
+
+class StandInServer:
+    """
+    The stand-in site, running on its own thread and event loop. Use it as a context manager, or call start and stop.
+
+    :port: Port to listen on (0 picks a free one).
+
+    :latency: Seconds every response is held back for, to act like a real round trip.
+
+    :jitter: Up to this many seconds are randomly added to the latency.
+
+    :errors: Share (0 to 1) of requests that get a 500 response.
+
+    :throttle: Share (0 to 1) of requests that get a 429 response with a Retry-After of 0.
+
+    :outage: How many requests (counting from the first one, or from the last call to start_outage) get a 503 response, like a short outage.
+
+    :category_pages: How many pages every category has.
+
+    :sitemap_size: How many profiles are listed in the sitemaps (split into sitemaps of 1000).
+    """
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, errors=0.0, throttle=0.0, outage=0, category_pages=10, sitemap_size=5000, seed=0):
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors
+        self.throttle = throttle
+        self.outage = outage
+        self.category_pages = category_pages
+        self.sitemap_size = sitemap_size
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._pages = {}
+        self._failing = {}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self,*exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        # Load the fixture pages with their links pointed at this server, then serve them from a background thread
+        for path in glob.glob(os.path.join(FIXTURES,"*.html")):
+            with open(path,encoding="utf-8") as f:
+                self._pages[os.path.basename(path)[:-5]] = f.read().replace(SITE_URL,"{site}")
+        self._profiles = sorted(name for name in self._pages if name.startswith("profile_"))
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve,args=(ready,),daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        if self._loop is None: return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(),self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def start_outage(self,requests:int):
+        # Make the next this many requests get a 503
+        self.outage = requests
+
+    def fail_path(self,path:str,requests:int,status:int=503,retry_after=None):
+        # Make the next this many requests for one path (e.g. '/category/actors/page/8/') fail with a status, with a Retry-After header if one is given
+        self._failing[path] = [requests,status,retry_after]
+
+    def _serve(self,ready):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/{path:.*}",self._handle)
+        self._runner = web.AppRunner(app,access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner,"127.0.0.1",self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        ready.set()
+        self._loop.run_forever()
+
+    def _page(self,name,offset=0):
+        # A fixture page with its links pointed at this server, and the people in it numbered from offset
+        html = self._pages[name].replace("{site}",self.url)
+        if offset:
+            html = _PERSON.sub(lambda m: f"person-{int(m.group(1))+offset}-net-worth",html)
+        return web.Response(text=html,content_type="text/html")
+
+    async def _handle(self,request):
+        self.requests += 1
+        if self.outage > 0:
+            self.outage -= 1
+            return web.Response(status=503,text="Service Unavailable")
+        failing = self._failing.get(request.path)
+        if failing and failing[0] > 0:
+            failing[0] -= 1
+            headers = {"Retry-After":str(failing[2])} if failing[2] is not None else None
+            return web.Response(status=failing[1],headers=headers,text="Failing on purpose")
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency+self._random.uniform(0,self.jitter))
+        if self._random.random() < self.errors:
+            return web.Response(status=500,text="Internal Server Error")
+        if self._random.random() < self.throttle:
+            return web.Response(status=429,headers={"Retry-After":"0"},text="Too Many Requests")
+        path = request.path
+        parts = path.strip("/").split("/")
+        if path.endswith("-net-worth/"):
+            # Every profile is one of the fixture ones, picked by its URL
+            return self._page(self._profiles[sum(map(ord,parts[-1])) % len(self._profiles)])
+        if parts[0] == "category" and len(parts) == 4:
+            number = int(parts[3])
+            if not 1 <= number <= self.category_pages:
+                return web.Response(status=404,text="Not Found")
+            return self._page("listing_category",(number-1)*1000)
+        if parts[0] == "map":
+            return self._page("listing_map")
+        if parts[0] == "list":
+            return self._page("listing_top")
+        if parts[0] == "random":
+            return self._page(self._random.choice(self._profiles))
+        if parts[0] == "dl":
+            return self._search(parts[1])
+        if path == "/robots.txt":
+            return web.Response(text=f"User-agent: *\nSitemap: {self.url}/sitemap_index.xml\n")
+        if path == "/sitemap_index.xml":
+            return self._sitemap_index()
+        if parts[0].startswith("post-sitemap"):
+            return self._sitemap(int(parts[0][len("post-sitemap"):-len(".xml")]))
+        return web.Response(status=404,text="Not Found")
+
+    def _search(self,query):
+        # A results page whose lead result is the searched name, or one with no results for names starting with 'nobody'
+        if query.startswith("nobody"):
+            return self._page("search_empty")
+        name = query.replace("-"," ").title()
+        html = self._pages["search_found"].replace("{site}",self.url).replace("john-sample",query).replace("John Sample",name)
+        return web.Response(text=html,content_type="text/html")
+
+    def _sitemap_index(self):
+        count = -(-self.sitemap_size//1000)
+        entries = "".join(f"<sitemap><loc>{self.url}/post-sitemap{i}.xml</loc><lastmod>2024-01-01T00:00:00+00:00</lastmod></sitemap>" for i in range(1,count+1))
+        return web.Response(text=f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>',content_type="application/xml")
+
+    def _sitemap(self,number):
+        first = (number-1)*1000
+        entries = "".join(f"<url><loc>{self.url}/richest-celebrities/person-{i}-net-worth/</loc><lastmod>2024-01-01T00:00:00+00:00</lastmod></url>" for i in range(first,min(first+1000,self.sitemap_size)))
+        return web.Response(text=f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>',content_type="application/xml")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the synthetic fixture pages as a local stand-in for the site.")
+    parser.add_argument("--port",type=int,default=8765)
+    parser.add_argument("--latency",type=float,default=0.0,help="Seconds every response is held back for.")
+    parser.add_argument("--jitter",type=float,default=0.0,help="Up to this many seconds randomly added to the latency.")
+    parser.add_argument("--errors",type=float,default=0.0,help="Share of requests that get a 500.")
+    parser.add_argument("--throttle",type=float,default=0.0,help="Share of requests that get a 429.")
+    parser.add_argument("--outage",type=int,default=0,help="How many of the first requests get a 503.")
+    parser.add_argument("--category-pages",type=int,default=10,help="How many pages every category has.")
+    args = parser.parse_args()
+    with StandInServer(args.port,args.latency,args.jitter,args.errors,args.throttle,args.outage,args.category_pages) as server:
+        print(f"Serving on {server.url} (Ctrl+C to stop) - set Options._SITE_URL = '{server.url}'")
+        try:
+            while True: time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -10,26 +10,105 @@ Scrape celebritynetworth.com and compile the profile data of celebrities, busine
 
 Usage
 -----
-Use the scrape_* functions to collect the profile data the way you want. Each function essentially visits the site through URLs, parses the profiles and collects the data it finds and returns it through Profile objects. Site URLs are handled asynchronously, which means you don't have to wait for one page to finish before the program moves onto the next - all pages get downloaded at the same time and then parsed sequentially once they all arrive. If you have connection problems, or if their servers decide they no longer like you, then the appropriate error gets thrown, the app crashes, the data currently collected gets dropped and you'll have to restart. This shouldn't ever be a problem, though, and the error will most likely be on your end. That said, you can always use try/except statements in your own code to 'retry' the scrape attempts.
+Use the scrape_* functions to collect the profile data the way you want. Each function essentially visits the site through URLs, parses the profiles and collects the data it finds and returns it through Profile objects. Site URLs are handled asynchronously, which means you don't have to wait for one page to finish before the program moves onto the next - pages get downloaded concurrently (up to the connection limits set in the Options class) and then parsed sequentially once they all arrive. If you have connection problems, or if their servers decide they no longer like you, pages get retried a few times (waiting longer each time, or as long as the site asks). Pages that still fail (or that can't be parsed) are skipped instead of crashing the whole scrape - the returned list holds everything that did work, and the URLs that failed are in its failed_urls so you can try just those again (see the retry options in the Options class).
 
 Options & Logging
 -----------------
-This program uses console and file logs to show the stages of what's happening when functions get called - you can change log settings in the Log class. You can also change miscellaneous options inside the Options class.
+This program uses console and file logs to show the stages of what's happening when functions get called - you can change log settings in the Log class. You can also change miscellaneous options inside the Options class, such as an on-disk cache (Options.set_cache) that makes repeat scrapes only download the pages that changed. To see where the time goes in a scrape, turn on the Metrics class and export its timings and counters as Prometheus text or JSON.
+
+Client
+------
+Each scrape function opens (and closes) its own connections to the site by default. If you're calling several of them back-to-back, wrap the calls in a 'with Client():' block so they all share one event loop and one pool of keep-alive connections.
+
+Every scrape_* function also has an async version (scrape_*_async) that runs on the caller's event loop instead of starting its own, so it can be awaited from inside an async application - and many of them can be run at once with asyncio.gather. Use 'async with Client():' to share one pool of connections between them, or pass your own aiohttp session to each call.
+
+Streaming
+---------
+The iter_* functions (and their iter_*_async versions) are streaming versions of the scrape_* functions. Downloading, link collecting and parsing all overlap and each Profile is handed back as soon as it's ready, so you get the first results right away and only a handful of pages sit in memory at once - handy for huge categories.
+
+Resuming
+--------
+Long scrape_category and scrape_names runs can be given a Journal, which keeps track of every finished page in a file. If the run gets interrupted, running it again with the same journal file only downloads what wasn't done yet.
+
+Several sources at once
+-----------------------
+To scrape several categories, map locations, top lists, etc. together, pass them as Source objects to scrape_sources. Profiles that show up in more than one of them are only downloaded once, and each one lists the sources it was found in.
+
+Crawling the whole site
+-----------------------
+For crawls too big for one process (e.g. every category and map location), use a Crawl. It keeps the URLs to visit in a work queue split into shards, and any number of worker processes - on one machine with the SqliteQueue that comes with this package, or on several with a queue backend of your own - take batches from it, download and parse them and write the profiles to a shared sink. Every URL is only visited once, and a stopped crawl picks up where it left off.
+
+Command line
+------------
+The same scrapes can be run from a shell (or a cron job) with 'python -m cnw_scraper', which streams the profiles out as NDJSON or CSV - see 'python -m cnw_scraper --help'. Importing the package is cheap: the scraping modules, aiohttp and the parsers are only loaded once they're first used.
 
 ETC...
 ------
-The site boasts tens of thousands of profiles, which can be all collected through using the scrape_category function. There's other stuff from the website you could potentially get, such as trending profiles, couple's info, articles, home page stuff, etc. They aren't implemented in this scraper because at that point you may as well just visit the website anyway. Fun fact: if you look on the site map XML, you'll find a directory for the maps section and inside you'll see that there's waaay more locations to choose from than the ones listed in the Location Enum.
+The site boasts tens of thousands of profiles, which can be all collected through using the scrape_category function. There's other stuff from the website you could potentially get, such as trending profiles, couple's info, articles, home page stuff, etc. They aren't implemented in this scraper because at that point you may as well just visit the website anyway. Fun fact: if you look on the site map XML, you'll find a directory for the maps section and inside you'll see that there's waaay more locations to choose from than the ones listed in the Location Enum. The sitemaps also list every profile on the site, which is what the iter_sitemap and iter_sitemap_profiles functions use to enumerate (or just get the recent changes of) the whole site.
 """
 
-from cnw_scraper.api import(
-    scrape_category,
-    scrape_map,
-    scrape_names,
-    scrape_random,
-    scrape_top,
-)
-from cnw_scraper.categories import Category
-from cnw_scraper.locations import Location
-from cnw_scraper.logs import Logs
-from cnw_scraper.options import Options
-from cnw_scraper.profile import Profile
\ No newline at end of file
+from importlib import import_module
+
+# Everything is imported on first use instead of up front, so importing the package (e.g. just for the Category/Location enums) doesn't pay for aiohttp and friends until a scrape actually needs them
+_EXPORTS = {
+    "find_last_page":"cnw_scraper.api",
+    "find_last_page_async":"cnw_scraper.api",
+    "iter_category":"cnw_scraper.api",
+    "iter_category_async":"cnw_scraper.api",
+    "iter_map":"cnw_scraper.api",
+    "iter_map_async":"cnw_scraper.api",
+    "iter_names":"cnw_scraper.api",
+    "iter_names_async":"cnw_scraper.api",
+    "iter_sitemap":"cnw_scraper.api",
+    "iter_sitemap_async":"cnw_scraper.api",
+    "iter_sitemap_profiles":"cnw_scraper.api",
+    "iter_sitemap_profiles_async":"cnw_scraper.api",
+    "iter_top":"cnw_scraper.api",
+    "iter_top_async":"cnw_scraper.api",
+    "iter_urls":"cnw_scraper.api",
+    "iter_urls_async":"cnw_scraper.api",
+    "scrape_category":"cnw_scraper.api",
+    "scrape_category_async":"cnw_scraper.api",
+    "scrape_category_updates":"cnw_scraper.api",
+    "scrape_category_updates_async":"cnw_scraper.api",
+    "scrape_map":"cnw_scraper.api",
+    "scrape_map_async":"cnw_scraper.api",
+    "scrape_names":"cnw_scraper.api",
+    "scrape_names_async":"cnw_scraper.api",
+    "scrape_random":"cnw_scraper.api",
+    "scrape_random_async":"cnw_scraper.api",
+    "scrape_sources":"cnw_scraper.api",
+    "scrape_sources_async":"cnw_scraper.api",
+    "scrape_top":"cnw_scraper.api",
+    "scrape_top_async":"cnw_scraper.api",
+    "scrape_urls":"cnw_scraper.api",
+    "scrape_urls_async":"cnw_scraper.api",
+    "Category":"cnw_scraper.categories",
+    "Client":"cnw_scraper.client",
+    "Crawl":"cnw_scraper.crawl",
+    "Sink":"cnw_scraper.crawl",
+    "SqliteQueue":"cnw_scraper.crawl",
+    "SqliteSink":"cnw_scraper.crawl",
+    "WorkQueue":"cnw_scraper.crawl",
+    "Journal":"cnw_scraper.journal",
+    "Location":"cnw_scraper.locations",
+    "Logs":"cnw_scraper.logs",
+    "Metrics":"cnw_scraper.metrics",
+    "NameIndex":"cnw_scraper.names",
+    "Options":"cnw_scraper.options",
+    "Profile":"cnw_scraper.profile",
+    "ProfileList":"cnw_scraper.profile",
+    "Source":"cnw_scraper.sources",
+    "ProfileTable":"cnw_scraper.table",
+}
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'cnw_scraper' has no attribute '{name}'")
+    value = getattr(import_module(_EXPORTS[name]),name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals())|set(__all__))
\ No newline at end of file
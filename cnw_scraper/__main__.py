@@ -1,2 +1,182 @@
+# ---------- Command line interface
+#
+# Streams profiles from the site to stdout (or a file) as they get parsed, one line of NDJSON (or a CSV row) per profile. E.g. -
+#
+#   python -m cnw_scraper category actors --start 1 --end 5 --format csv -o actors.csv
+#   python -m cnw_scraper names "Tom Cruise" "Oprah Winfrey"
+#   python -m cnw_scraper sitemap --since 2024-01-01 --urls-only | python -m cnw_scraper urls - --no-description
+#
+# Only the arguments are parsed up front - the scraping modules (and aiohttp, bs4, etc.) are imported once there's something to scrape, so '--help' and bad arguments come back right away.
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import date
+from cnw_scraper import __version__
+from cnw_scraper.categories import Category
+from cnw_scraper.locations import Location
+
+def _lines(paths,key):
+    # Non-empty lines of each file, read as they are needed ('-' is stdin). Lines of NDJSON (e.g. this program's own output) give the value of their key.
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path,encoding="utf-8")
+        try:
+            for line in f:
+                line = line.strip()
+                if line.startswith("{"):
+                    line = json.loads(line).get(key)
+                if line: yield line
+        finally:
+            if f is not sys.stdin: f.close()
+
+def page(value):
+    # A page number, or 'auto' for the last page (named for argparse's error messages)
+    return value if value == "auto" else int(value)
+
+def _inputs(args):
+    # Names/URLs given on the command line, followed by the ones in --file
+    key = "url" if args.command == "urls" else "name"
+    for value in args.values:
+        if value == "-":
+            yield from _lines(["-"],key)
+        else:
+            yield value
+    yield from _lines(args.file,key)
+
+def _profiles(args):
+    # The stream of results the command asked for
+    import cnw_scraper.api as api
+    if args.command == "category":
+        return api.iter_category(Category[args.category.upper()],args.start,args.end)
+    if args.command == "map":
+        return api.iter_map(Location[args.location.upper()])
+    if args.command == "top":
+        return api.iter_top(Category[args.category.upper()] if args.category else None)
+    if args.command == "names":
+        return api.iter_names(list(_inputs(args)))
+    if args.command == "urls":
+        return api.iter_urls(_inputs(args))
+    if args.command == "random":
+        return iter([api.scrape_random()])
+    if args.urls_only:
+        return api.iter_sitemap(args.since)
+    return api.iter_sitemap_profiles(args.since)
+
+def _rows(args):
+    # Column names, and a row of values for each result
+    if args.command == "sitemap" and args.urls_only:
+        return ["url","lastmod"],(list(entry) for entry in _profiles(args))
+    from cnw_scraper.table import COLUMNS,_row
+    columns = [name for name in COLUMNS if args.description or name != "description"]
+    return columns,(_row(profile,columns) for profile in _profiles(args))
+
+def _write(args,out):
+    # Write out each row as soon as it comes in
+    columns,rows = _rows(args)
+    if args.format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(columns)
+    count = 0
+    for row in rows:
+        row = [value.isoformat() if isinstance(value,date) else value for value in row]
+        if args.format == "csv":
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(dict(zip(columns,row)))+"\n")
+        count += 1
+        if args.flush: out.flush()
+    return count
+
+def _setup(args):
+    # Apply the options and logging arguments
+    from cnw_scraper.logs import Logs
+    from cnw_scraper.options import Options
+    Options.include_description = args.description
+    if args.parser: Options.parser = args.parser
+    if args.parse_workers is not None: Options.parse_workers = args.parse_workers
+    if args.connections is not None: Options.max_connections = args.connections
+    if args.cache: Options.set_cache(args.cache)
+    if args.verbose:
+        # Logs go to stderr, so they don't get mixed in with the results on stdout
+        import logging
+        Logs.verbose = args.verbose > 1
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("CNW - %(message)s"))
+        handler.setLevel(logging.DEBUG if Logs.verbose else logging.INFO)
+        logger = logging.getLogger("cnw_scraper")
+        logger.addHandler(handler)
+        logger.setLevel(handler.level)
+    if args.log:
+        Logs.write_to_file(args.log[:-len(".log")] if args.log.endswith(".log") else args.log,as_json=args.log_json)
+
+def parser():
+    # The argument parser, with a sub-command for each way of getting profiles
+    categories = [category.name.lower() for category in Category]
+    locations = [location.name.lower() for location in Location]
+    main = argparse.ArgumentParser(prog="python -m cnw_scraper",description="Scrape profiles from celebritynetworth.com and stream them out as NDJSON (one JSON object per line) or CSV, as soon as each one is parsed.")
+    main.add_argument("--version",action="version",version=f"cnw_scraper {__version__}")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-f","--format",choices=["ndjson","csv"],default="ndjson",help="Output format (default: ndjson).")
+    common.add_argument("-o","--output",default="-",help="File to write the results to (default: stdout).")
+    common.add_argument("--flush",action="store_true",help="Flush the output after every result, for piping into a program that reads as it goes.")
+    common.add_argument("--no-description",dest="description",action="store_false",help="Leave out the descriptions (they are long, and skipping them makes parsing faster).")
+    common.add_argument("--parser",choices=["selectolax","lxml","html.parser"],help="Parser backend to use (falls back to the next fastest one if it isn't installed).")
+    common.add_argument("--parse-workers",type=int,help="Parse pages on this many worker processes.")
+    common.add_argument("--connections",type=int,help="Most requests that can be in-flight at the same time.")
+    common.add_argument("--cache",metavar="PATH",help="Keep downloaded pages in an on-disk cache at PATH, so repeat runs only download what changed.")
+    common.add_argument("-v","--verbose",action="count",default=0,help="Log progress to stderr (-vv for every detail).")
+    common.add_argument("--log",metavar="PATH",help="Write a log file to PATH (a '.log' extension is added if it doesn't have one).")
+    common.add_argument("--log-json",action="store_true",help="Write the log file as JSON lines, with each entry's fields.")
+    commands = main.add_subparsers(dest="command",metavar="command")
+    commands.required = True
+
+    command = commands.add_parser("category",parents=[common],help="Profiles from a category's pages.")
+    command.add_argument("category",choices=categories,metavar="category",help=f"One of: {', '.join(categories)}.")
+    command.add_argument("--start",type=int,default=1,help="Page to start at (default: 1).")
+    command.add_argument("--end",type=page,default=0,help="Page to end at, or 'auto' for the category's last page (default: the starting page).")
+
+    command = commands.add_parser("map",parents=[common],help="Profiles from a location on the site's map.")
+    command.add_argument("location",choices=locations,metavar="location",help=f"One of: {', '.join(locations)}.")
+
+    command = commands.add_parser("top",parents=[common],help="Profiles from the Top 100 list, or a category's top list.")
+    command.add_argument("category",nargs="?",choices=categories,metavar="category",help="Category of the top list (default: the Top 100 list).")
+
+    command = commands.add_parser("names",parents=[common],help="Search for people/things by name and get their profiles.")
+    command.add_argument("values",nargs="*",metavar="name",help="Names to search for ('-' reads them from stdin, one per line or as NDJSON with a 'name' key).")
+    command.add_argument("--file",action="append",default=[],help="File with a name on each line, or NDJSON with a 'name' key (can be given more than once).")
+
+    command = commands.add_parser("urls",parents=[common],help="Profiles from profile page URLs.")
+    command.add_argument("values",nargs="*",metavar="url",help="Profile page URLs ('-' reads them from stdin, one per line or as NDJSON with a 'url' key).")
+    command.add_argument("--file",action="append",default=[],help="File with a URL on each line, or NDJSON with a 'url' key (can be given more than once).")
+
+    commands.add_parser("random",parents=[common],help="A random profile.")
+
+    command = commands.add_parser("sitemap",parents=[common],help="Every profile listed in the site's sitemaps.")
+    command.add_argument("--since",help="Only the profiles modified on/after this ISO 8601 date or time (e.g. 2024-01-01).")
+    command.add_argument("--urls-only",action="store_true",help="Only list the URLs and when they were last modified, without getting the profiles.")
+    return main
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if args.command in ["names","urls"] and not (args.values or args.file):
+        parser().error(f"{args.command}: give at least one value, '-' or --file")
+    _setup(args)
+    out = sys.stdout if args.output == "-" else open(args.output,"w",newline="" if args.format == "csv" else None,encoding="utf-8")
+    try:
+        count = _write(args,out)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Whatever was reading the output stopped (e.g. '| head') - that's fine
+        os.dup2(os.open(os.devnull,os.O_WRONLY),sys.stdout.fileno())
+        return 0
+    finally:
+        if out is not sys.stdout: out.close()
+    if args.verbose:
+        print(f"CNW - {count} result(s) written.",file=sys.stderr)
+    return 0
+
 if __name__ == "__main__":
-    print("What are you doing here? You're not supposed to run this program by itself. Shoo.")
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,67 +1,189 @@
 # ---------- Main API for the user
 
+import asyncio
 import cnw_scraper.base_functions as bf
+import cnw_scraper.sitemap as sm
+from cnw_scraper.client import current_session,open_session,session_scope
 from cnw_scraper.categories import Category
 from cnw_scraper.locations import Location
 from cnw_scraper.logs import Logs
 from cnw_scraper.options import Options as opt
-from bs4 import BeautifulSoup,SoupStrainer
 
-def scrape_category(category:Category,starting_page:int=1,ending_page:int=0,sort_by:str="",sort_ascending:bool=True):
+def scrape_category(category:Category,starting_page:int=1,ending_page:int=0,sort_by:str="",sort_ascending:bool=True,journal=None):
     """
     Get the profiles from a category within a page range. Pages are scraped from the very start of the starting page, all the way to the very last profile on the ending page. By default, get only the profiles from the first page of the category. All categories start on page 1.
     
     Note: Some categories have hundreds of pages and thousands of profiles and may take a considerable amount of time to collect them all (relative to the other scrape functions).
     
-    Tip: Because the website offers no method of getting the total number of pages in a category (without actually visiting the page to see if it is valid - or through hacking), it is up to the user to determine what the starting and ending pages should be. This is done to speed up page collection for async HTTP requests. It's best to test how many pages exist first before collecting them. Out-of-range pages will return a 404 and will be safely filtered out upon profile parsing. Don't set the ending page too high otherwise the requested pages will be mostly 404 junk - and that wastes electricity and bandwidth. Think about the environment.
+    Tip: Because the website offers no method of getting the total number of pages in a category (without actually visiting the page to see if it is valid - or through hacking), it is up to the user to determine what the starting and ending pages should be. This is done to speed up page collection for async HTTP requests. It's best to test how many pages exist first before collecting them - or let ending_page='auto' do it for you (see find_last_page). Out-of-range pages will return a 404 and will be safely filtered out upon profile parsing. Don't set the ending page too high otherwise the requested pages will be mostly 404 junk - and that wastes electricity and bandwidth. Think about the environment.
     
     :category: Enum from Category class to use. E.g. - category = Category.AUTHORS
     
     :starting_page: The page to start scraping (>0). If less than 1, it will be set to 1.
     
-    :ending_page: The last page to scrape (>=starting_page). Inclusive. If less than starting_page, it will be set to starting_page.
+    :ending_page: The last page to scrape (>=starting_page). Inclusive. If less than starting_page, it will be set to starting_page. Use 'auto' to scrape up to the last page of the category, found with find_last_page.
     
     :sort_by: Sort the list of profiles by either 'name' or 'worth' - default (empty string), or invalid, means no sorting is applied.
     
     :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
+
+    :journal: An optional Journal to keep track of the finished pages in, so the scrape can be resumed from where it stopped if it gets interrupted. Run it again with the same journal file and only the pages that aren't done yet get downloaded.
     
+    :return: A list of Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_category_async(category,starting_page,ending_page,sort_by,sort_ascending,journal))
+
+async def scrape_category_async(category:Category,starting_page:int=1,ending_page:int=0,sort_by:str="",sort_ascending:bool=True,journal=None,session=None):
+    """
+    Async version of scrape_category, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
     :return: A list of Profile objects - optionally sorted.
     """
+    async with session_scope(session):
+        return await _scrape_category(category,starting_page,ending_page,sort_by,sort_ascending,journal)
+
+async def _scrape_category(category,starting_page,ending_page,sort_by,sort_ascending,journal):
     Logs._log("Starting Category function ...")
     if starting_page < 1:
         starting_page = 1
     if not isinstance(category,Category):
         raise Exception("Invalid Category Parameter.")
+    if ending_page == "auto":
+        ending_page = await bf.find_last_page(category,current_session())
     if starting_page > ending_page:
         ending_page = starting_page
-    base_url = "https://www.celebritynetworth.com/category/" + category.value + "/page/"
     # Get category pages containing profiles from start to end, filtering out 404s.
-    Logs._log(f"Getting pages from {category.name} category ...")
-    cat_urls = [base_url+str(i)+"/" for i in range(starting_page,ending_page+1)]
-    Logs._log(f"Getting {len(cat_urls)} page(s) ...")
-    cat_pages = list(filter(lambda x: not (x["status"]>=400), bf.get_pages(cat_urls)))
-    Logs._log(f"Collected {len(cat_pages)} valid page(s) ...")
+    Logs._log("Getting pages from %s category ...",category.name)
+    cat_urls = bf.category_urls(category,starting_page,ending_page)
+    Logs._log("Getting %d page(s) ...",len(cat_urls))
+    failed_urls = []
+    # Get all profile links in the pages
+    profile_urls = await bf.collect_links(cat_urls,"post_listing",failed_urls,journal)
     # Get profiles
     profiles = []
-    if cat_pages:
-        # Get all profile links in the pages
-        profile_urls = []
-        for page in cat_pages:
-            profile_urls.extend(bf.get_profile_links_in_page(page["html"],"post_listing"))
+    if profile_urls:
         # Get profiles from pages and parse them
-        Logs._log(f"Getting {len(profile_urls)} profile(s) from pages ...")
-        profile_pages = bf.get_pages(profile_urls)
-        Logs._log("Parsing pages of profiles ...")
-        profiles = [bf.parse_profile(page["html"]) for page in profile_pages]
+        Logs._log("Getting %d profile(s) from pages ...",len(profile_urls))
+        profiles = await bf.collect_profiles(profile_urls,failed_urls,journal)
     else:
         # The result of nothing but invalid pages
         Logs._log("No Profiles found!")
     # Wrap up
     Logs._log("Profiles compilation finished ...")
-    profiles = bf.sort_profiles(profiles,sort_by,sort_ascending)
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
     Logs._log("Category function finished.")
     return profiles
 
+def find_last_page(category:Category):
+    """
+    Find out how many pages a category has, using a few quick probes of whether pages exist (without downloading them): the page number is doubled until a page doesn't exist, then the last valid page is narrowed down between the last two. Even categories with hundreds of pages only take about a dozen probes. The result is remembered for Options.page_count_ttl seconds, so calling this again (or using ending_page='auto') right after is free. Only a 'not found' answer counts as a missing page - if the site keeps failing (throttling, server errors, connection problems) after the retries in Options, an Exception is raised instead of guessing. The same goes for a category that still seems to have pages at page 16384 (e.g. if the site starts redirecting out-of-range pages instead of answering 'not found').
+
+    :category: Enum from Category class to use. E.g. - category = Category.AUTHORS
+
+    :return: The number of the last valid page (0 if the category has no pages at all).
+    """
+    return bf.run(find_last_page_async(category))
+
+async def find_last_page_async(category:Category,session=None):
+    """
+    Async version of find_last_page, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: The number of the last valid page (0 if the category has no pages at all).
+    """
+    if not isinstance(category,Category):
+        raise Exception("Invalid Category Parameter.")
+    async with open_session(session) as session:
+        return await bf.find_last_page(category,session)
+
+def scrape_category_updates(category:Category,known:dict,stop_after:int=20,max_pages:int=0,sort_by:str="",sort_ascending:bool=True):
+    """
+    Incrementally scrape a category: get only the profiles that are new or have changed since the last time, and stop paging once the profiles are all ones that were already seen. The site lists the most recently added/updated profiles of a category first, so a daily refresh of even a huge category only takes a handful of pages.
+
+    Pages are walked in order from page 1. Each profile on them is compared against the known profiles by its 'Last Updated' stat - profiles that aren't known, or whose 'Last Updated' is different, are returned (and recorded in known). Once stop_after known, unchanged profiles in a row have been seen, paging stops.
+
+    Tip: Profiles have to be downloaded to see their 'Last Updated' stat. Turn on the cache (Options.set_cache) so the unchanged ones only cost a short 'not modified' response each.
+
+    :category: Enum from Category class to use. E.g. - category = Category.ACTORS
+
+    :known: A dict of profile URL -> 'Last Updated' stat of the profiles seen so far, which gets updated in place. Start with an empty dict (which gets the whole category) and save it between runs - it's plain strings, so it can be written to JSON as is.
+
+    :stop_after: How many known, unchanged profiles in a row it takes to stop.
+
+    :max_pages: The most pages to walk through, as a safety net. 0 (default) means no limit.
+
+    :sort_by: Sort the list of profiles by either 'name' or 'worth' - default (empty string), or invalid, means no sorting is applied.
+
+    :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
+
+    :return: A list of the new/changed Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls (and their profiles aren't recorded in known, so they get checked again next time).
+    """
+    return bf.run(scrape_category_updates_async(category,known,stop_after,max_pages,sort_by,sort_ascending))
+
+async def scrape_category_updates_async(category:Category,known:dict,stop_after:int=20,max_pages:int=0,sort_by:str="",sort_ascending:bool=True,session=None):
+    """
+    Async version of scrape_category_updates, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: A list of the new/changed Profile objects - optionally sorted.
+    """
+    async with session_scope(session):
+        return await _scrape_category_updates(category,known,stop_after,max_pages,sort_by,sort_ascending)
+
+async def _scrape_category_updates(category,known,stop_after,max_pages,sort_by,sort_ascending):
+    Logs._log("Starting Category Updates function ...")
+    if not isinstance(category,Category):
+        raise Exception("Invalid Category Parameter.")
+    profiles = []
+    failed_urls = []
+    unchanged = 0
+    page_number = 1
+    next_page = asyncio.ensure_future(bf.get_pages_async(bf.category_urls(category,1,1)))
+    while True:
+        cat_page = (await next_page)[0]
+        if cat_page["error"]:
+            failed_urls.append(cat_page["url"])
+            break
+        if cat_page["status"] >= 400:
+            Logs._log("Reached the end of the %s category ...",category.name)
+            break
+        profile_urls = bf.get_profile_links_in_page(cat_page["html"],"post_listing")
+        if not profile_urls:
+            break
+        # Get the profiles on this page while the next page is on its way
+        Logs._log("Checking %d profile(s) on page %d ...",len(profile_urls),page_number)
+        next_page = asyncio.ensure_future(bf.get_pages_async(bf.category_urls(category,page_number+1,page_number+1)))
+        profile_pages = bf.split_pages(await bf.get_pages_async(profile_urls),failed_urls)
+        parsed = await bf.parse_all(bf.profile_parser(),[page["html"] for page in profile_pages])
+        for page,profile in zip(profile_pages,parsed):
+            if bf.parse_failed(page,profile,failed_urls): continue
+            url = profile.url = page["url"]
+            updated = profile.stats.get("Last Updated","")
+            if url in known and known[url] == updated:
+                unchanged += 1
+                if unchanged >= stop_after: break
+                continue
+            unchanged = 0
+            known[url] = updated
+            profiles.append(profile)
+        if unchanged >= stop_after:
+            Logs._log("Found %d unchanged profile(s) in a row ...",unchanged)
+            break
+        if max_pages and page_number >= max_pages:
+            break
+        page_number += 1
+    if not next_page.done():
+        next_page.cancel()
+    # Wrap up
+    Logs._log("Found %d new/changed profile(s) ...",len(profiles))
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
+    Logs._log("Category Updates function finished.")
+    return profiles
+
 def scrape_map(location:Location,sort_by:str="",sort_ascending:bool=True):
     """
     Get the top 100 profiles from a map location on the site.
@@ -72,78 +194,82 @@ def scrape_map(location:Location,sort_by:str="",sort_ascending:bool=True):
     
     :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
     
+    :return: A list of Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_map_async(location,sort_by,sort_ascending))
+
+async def scrape_map_async(location:Location,sort_by:str="",sort_ascending:bool=True,session=None):
+    """
+    Async version of scrape_map, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
     :return: A list of Profile objects - optionally sorted.
     """
+    async with session_scope(session):
+        return await _scrape_map(location,sort_by,sort_ascending)
+
+async def _scrape_map(location,sort_by,sort_ascending):
     Logs._log("Starting Map function ...")
     if not isinstance(location,Location):
         raise Exception("Invalid Location Parameter")
-    Logs._log(f"Getting map page for {location.name} ...")
-    map_url = "https://www.celebritynetworth.com/map/" + location.value + "/"
-    html = bf.get_pages([map_url])[0]["html"]
+    Logs._log("Getting map page for %s ...",location.name)
+    failed_urls = []
     Logs._log("Collecting profile URLs from map ...")
     # Get profile links from list inside page and parse the profiles
-    profile_urls = bf.get_profile_links_in_page(html,"cnwMaps_mainProfileList")
-    profile_pages = bf.get_pages(profile_urls)
-    profiles = [bf.parse_profile(page["html"]) for page in profile_pages]
+    profile_urls = await bf.collect_links([bf.map_url(location)],"cnwMaps_mainProfileList",failed_urls)
+    profiles = await bf.collect_profiles(profile_urls,failed_urls)
     # Wrap up
     Logs._log("Profiles compilation finished ...")
-    profiles = bf.sort_profiles(profiles,sort_by,sort_ascending)
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
     Logs._log("Map function finished.")
     return profiles
 
-def scrape_names(names:list,sort_by:str="",sort_ascending:bool=True):
+def scrape_names(names:list,sort_by:str="",sort_ascending:bool=True,journal=None,index=None):
     """
     Use the site's search feature to check for each name provided and collect profile data on the subject if the name matches the query. If a name isn't found/doesn't match, no profile for it will be returned.
     
     Tip: Be sure to not use prefixes (Dr./Mr./Mrs./etc.) - suffixes are usually fine, and use only one space between words - the search engine on the site can be picky. Usually the first/last name is enough to get the right profile.
 
-    Note: Duplicate names or 'similar names' are not discarded or cleaned whatsoever. It is up to you to provide a list of unique and clean names.
+    Note: Duplicate names or 'similar names' are not discarded or cleaned whatsoever. It is up to you to provide a list of unique and clean names. The same name is only searched for once though, and searches are remembered for a while (see Options.search_memo_size), so asking again for a name - found or not - doesn't search the site again.
     
     :names: An iterable of strings, with each being the real name (and/or 'stage name') of a person/thing (alphanumeric/spaces/hyphens/apostrophes only, everything else gets stripped). E.g. - ['Elon Musk', 'Apple', 'OPRAH', 'DEADMAU5', 'bill gates', 'Dwayne "The Rock" Johnson', 'The Undertaker']
     
     :sort_by: Sort the list of profiles by either 'name' or 'worth' - default (empty string), or invalid, means no sorting is applied.
     
     :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
+
+    :journal: An optional Journal to keep track of the finished searches and profiles in, so the scrape can be resumed from where it stopped if it gets interrupted. Run it again with the same journal file and only what isn't done yet gets downloaded.
+
+    :index: An optional NameIndex of known names and their profile URLs. Names found in it aren't searched for on the site at all, and names found through the search get added to it.
     
+    :return: A list of Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_names_async(names,sort_by,sort_ascending,journal,index))
+
+async def scrape_names_async(names:list,sort_by:str="",sort_ascending:bool=True,journal=None,index=None,session=None):
+    """
+    Async version of scrape_names, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
     :return: A list of Profile objects - optionally sorted.
     """
+    async with session_scope(session):
+        return await _scrape_names(names,sort_by,sort_ascending,journal,index)
+
+async def _scrape_names(names,sort_by,sort_ascending,journal,index):
     Logs._log("Starting Names function ...")
-    search_urls = []
-    valid_chars = lambda c: c.isalnum() or any([x in c for x in [" ","-","'"]])
-    parse_name = lambda n: "".join(filter(valid_chars, n)).strip()
-    Logs._log("Creating search URLs ...")
-    for name in names:
-        # Parse current name for URL query and add to search list - with no duplicate URLs or names
-        query = parse_name(name).replace(" ", "-").replace("'","")
-        url = "https://www.celebritynetworth.com/dl/" + query.lower() + "/"
-        search_urls.append(url)
     Logs._log("Getting search results ...")
-    # Collect the search result pages from the URLs
-    results = bf.get_pages(search_urls)
-    # Loop through the resulting search pages and store the profile's URL in a list if valid
-    profile_urls = []
-    tag = "post_item anchored  search_result lead"
-    for i,page in enumerate(results):
-        lead = BeautifulSoup(page["html"],features=opt._PARSER,parse_only=SoupStrainer(attrs={"class":tag}))
-        current_name = parse_name(names[i])
-        if lead.text:
-            # There's a lead search result, check if the contents have our target's name
-            txt = lead.text.lower()
-            if all([x in txt for x in current_name.lower().split()]):
-                # It does - get the target's profile url
-                Logs._log(f"FOUND: '{names[i]}' matches with result.",True)
-                profile_urls.append(lead.find("a")["href"])
-            else:
-                Logs._log(f"FAILED: '{names[i]}' doesn't seem to match search result.",True)
-        else:
-            Logs._log(f"FAILED: Search for '{names[i]}' returned no results.",True)
+    # Search for each name and keep the URLs of the profiles that match
+    failed_urls = []
+    profile_urls = await bf.collect_searches(list(names),failed_urls,journal,index)
     # Get and parse the profiles
     Logs._log("Getting matching profiles ...")
-    profile_pages = bf.get_pages(profile_urls)
-    profiles = [bf.parse_profile(page["html"]) for page in profile_pages]
+    profiles = await bf.collect_profiles(profile_urls,failed_urls,journal)
     # Wrap up
     Logs._log("Profiles compilation finished ...")
-    profiles = bf.sort_profiles(profiles,sort_by,sort_ascending)
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
     Logs._log("Names function finished.")
     return profiles
 
@@ -153,10 +279,26 @@ def scrape_random():
     
     :return: A single Profile object from a randomly chosen subject.
     """
+    return bf.run(scrape_random_async())
+
+async def scrape_random_async(session=None):
+    """
+    Async version of scrape_random, for use inside of a running event loop.
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: A single Profile object from a randomly chosen subject.
+    """
+    async with session_scope(session):
+        return await _scrape_random()
+
+async def _scrape_random():
     Logs._log("Starting Random function ...")
-    url = "https://www.celebritynetworth.com/random/"
-    html = bf.get_pages([url])[0]["html"]
-    profile = bf.parse_profile(html)
+    url = opt._SITE_URL + "/random/"
+    page = (await bf.get_pages_async([url]))[0]
+    if not bf.is_valid(page):
+        raise Exception(f"Couldn't get a random profile ({page['error'] or page['status']}).")
+    profile = bf.parse_profile(page["html"])
     # Wrap up
     Logs._log("Profile compilation finished ...")
     Logs._log("Random function finished.")
@@ -172,25 +314,330 @@ def scrape_top(category:Category=None,sort_by:str="",sort_ascending:bool=True):
     
     :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
     
+    :return: A list of Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_top_async(category,sort_by,sort_ascending))
+
+async def scrape_top_async(category:Category=None,sort_by:str="",sort_ascending:bool=True,session=None):
+    """
+    Async version of scrape_top, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
     :return: A list of Profile objects - optionally sorted.
     """
+    async with session_scope(session):
+        return await _scrape_top(category,sort_by,sort_ascending)
+
+async def _scrape_top(category,sort_by,sort_ascending):
     Logs._log("Starting Top function ...")
-    if category:
-        # Check if there's a category and assign the appropriate URL
-        if not isinstance(category,Category):
-            raise Exception("Invalid Category Parameter")
-        top_url = "https://www.celebritynetworth.com/list/top-50-" + category.value + "/"
-    else:
-        top_url = "https://www.celebritynetworth.com/list/top-100-richest-people-in-the-world/"
-    Logs._log(f"Getting toplist page for {category.name if category else 'Top 100'} category ...")
-    html = bf.get_pages([top_url])[0]["html"]
+    top_url = bf.top_url(category)
+    Logs._log("Getting toplist page for %s category ...",category.name if category else "Top 100")
+    failed_urls = []
     Logs._log("Collecting profile URLs from list ...")
     # Get profiles from list inside page
-    profile_urls = bf.get_profile_links_in_page(html,"top_100_list")
-    profile_pages = bf.get_pages(profile_urls)
-    profiles = [bf.parse_profile(page["html"]) for page in profile_pages]
+    profile_urls = await bf.collect_links([top_url],"top_100_list",failed_urls)
+    profiles = await bf.collect_profiles(profile_urls,failed_urls)
     # Wrap up
     Logs._log("Profiles compilation finished ...")
-    profiles = bf.sort_profiles(profiles,sort_by,sort_ascending)
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
     Logs._log("Top function finished.")
-    return profiles
\ No newline at end of file
+    return profiles
+
+def scrape_urls(urls:list,sort_by:str="",sort_ascending:bool=True):
+    """
+    Get the profiles from a list of profile page URLs you already have - e.g. from iter_sitemap, or ones saved from an earlier scrape. Invalid (404) pages are skipped.
+
+    :urls: An iterable of profile page URLs. E.g. - ['https://www.celebritynetworth.com/richest-businessmen/ceos/elon-musk-net-worth/']
+
+    :sort_by: Sort the list of profiles by either 'name' or 'worth' - default (empty string), or invalid, means no sorting is applied.
+
+    :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
+
+    :return: A list of Profile objects - optionally sorted. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_urls_async(urls,sort_by,sort_ascending))
+
+async def scrape_urls_async(urls:list,sort_by:str="",sort_ascending:bool=True,session=None):
+    """
+    Async version of scrape_urls, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: A list of Profile objects - optionally sorted.
+    """
+    async with session_scope(session):
+        return await _scrape_urls(urls,sort_by,sort_ascending)
+
+async def _scrape_urls(urls,sort_by,sort_ascending):
+    Logs._log("Starting URLs function ...")
+    Logs._log("Getting profiles from URLs ...")
+    failed_urls = []
+    profiles = await bf.collect_profiles(list(urls),failed_urls)
+    # Wrap up
+    Logs._log("Profiles compilation finished ...")
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
+    Logs._log("URLs function finished.")
+    return profiles
+
+def scrape_sources(sources:list,sort_by:str="",sort_ascending:bool=True):
+    """
+    Get the profiles from several sources (categories, map locations, top lists, names, URLs) in one go, fetching each profile only once. The profile URLs of all the sources are collected first, then the different spellings of the same URL (http/https, 'www.' or not, trailing slash, etc.) are merged, so a profile that shows up in several sources - e.g. the BILLIONAIRES, BUSINESS and CEOS categories - is downloaded and parsed a single time. E.g. -
+
+        profiles = scrape_sources([Source.top(), Source.category(Category.CEOS, 1, 5), Source.map(Location.NEW_YORK)])
+
+    :sources: An iterable of Source objects.
+
+    :sort_by: Sort the list of profiles by either 'name' or 'worth' - default (empty string), or invalid, means no sorting is applied.
+
+    :sort_ascending: Should the sorted profiles be returned in ascending or descending form?
+
+    :return: A list of Profile objects (one per profile, no matter how many sources had it) - optionally sorted. Each one's sources attribute lists the labels of the sources it came from. Pages that couldn't be downloaded or parsed are listed in its failed_urls.
+    """
+    return bf.run(scrape_sources_async(sources,sort_by,sort_ascending))
+
+async def scrape_sources_async(sources:list,sort_by:str="",sort_ascending:bool=True,session=None):
+    """
+    Async version of scrape_sources, for use inside of a running event loop. Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: A list of Profile objects - optionally sorted.
+    """
+    async with session_scope(session):
+        return await _scrape_sources(sources,sort_by,sort_ascending)
+
+async def _scrape_sources(sources,sort_by,sort_ascending):
+    Logs._log("Starting Sources function ...")
+    sources = list(sources)
+    failed_urls = []
+    # Collect the profile URLs of every source at once
+    Logs._log("Collecting profile URLs from %d source(s) ...",len(sources))
+    links = await asyncio.gather(*[source._collect(failed_urls) for source in sources])
+    # Merge them by their canonical URL, keeping track of which sources had each one
+    labels = {}
+    for source,profile_urls in zip(sources,links):
+        for url in profile_urls:
+            found_in = labels.setdefault(bf.canonical_url(url),[])
+            if source.label not in found_in: found_in.append(source.label)
+    Logs._log("Getting %d unique profile(s) from %d link(s) ...",len(labels),sum(len(urls) for urls in links))
+    profiles = await bf.collect_profiles(list(labels),failed_urls)
+    for profile in profiles:
+        profile.sources = labels[profile.url]
+    # Wrap up
+    Logs._log("Profiles compilation finished ...")
+    profiles = bf.wrap_up(profiles,failed_urls,sort_by,sort_ascending)
+    Logs._log("Sources function finished.")
+    return profiles
+
+# ---------- Streaming versions of the scrape functions
+
+def iter_category(category:Category,starting_page:int=1,ending_page:int=0):
+    """
+    Streaming version of scrape_category. Instead of waiting for every page to arrive before parsing anything, the category pages, profile pages and parsing all overlap, and each Profile is yielded as soon as it's parsed. Only a handful of pages (depending on Options.max_connections) are held in memory at once, no matter how big the category is.
+
+    Note: Profiles come out in the order they finish, not the order they're listed on the site, and they can't be sorted until they've all been collected. Breaking out of the loop early stops the remaining downloads.
+
+    :category: Enum from Category class to use. E.g. - category = Category.AUTHORS
+
+    :starting_page: The page to start scraping (>0). If less than 1, it will be set to 1.
+
+    :ending_page: The last page to scrape (>=starting_page). Inclusive. If less than starting_page, it will be set to starting_page. Use 'auto' to scrape up to the last page of the category, found with find_last_page.
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_category_async(category,starting_page,ending_page))
+
+async def iter_category_async(category:Category,starting_page:int=1,ending_page:int=0,session=None):
+    """
+    Async version of iter_category, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    if not isinstance(category,Category):
+        raise Exception("Invalid Category Parameter.")
+    if starting_page < 1:
+        starting_page = 1
+    Logs._log("Streaming profiles from %s category ...",category.name)
+    async with open_session(session) as session:
+        if ending_page == "auto":
+            ending_page = await bf.find_last_page(category,session)
+        if starting_page > ending_page:
+            ending_page = starting_page
+        links = bf.stream_profile_links(bf.category_urls(category,starting_page,ending_page),"post_listing",session)
+        async with bf.closing(bf.stream_profiles(links,session)) as profiles:
+            async for profile in profiles:
+                yield profile
+    Logs._log("Category stream finished.")
+
+def iter_map(location:Location):
+    """
+    Streaming version of scrape_map. Each Profile is yielded as soon as it's parsed, in the order they finish.
+
+    :location: Enum from Location class to use. E.g. - location = Location.USA
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_map_async(location))
+
+async def iter_map_async(location:Location,session=None):
+    """
+    Async version of iter_map, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    if not isinstance(location,Location):
+        raise Exception("Invalid Location Parameter")
+    Logs._log("Streaming profiles from %s map ...",location.name)
+    map_url = bf.map_url(location)
+    async with open_session(session) as session:
+        links = bf.stream_profile_links([map_url],"cnwMaps_mainProfileList",session)
+        async with bf.closing(bf.stream_profiles(links,session)) as profiles:
+            async for profile in profiles:
+                yield profile
+    Logs._log("Map stream finished.")
+
+def iter_names(names:list):
+    """
+    Streaming version of scrape_names. Names are searched for, matched and their profiles parsed all at the same time, and each Profile is yielded as soon as it's parsed, in the order they finish. Names that don't match anything are skipped.
+
+    :names: An iterable of strings, with each being the real name (and/or 'stage name') of a person/thing. See scrape_names for details.
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_names_async(names))
+
+async def iter_names_async(names:list,session=None):
+    """
+    Async version of iter_names, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    Logs._log("Streaming profiles from names ...")
+    async with open_session(session) as session:
+        # Remember which name each search URL was for, so the results can be matched against it
+        searches = {}
+        for name in names:
+            searches.setdefault(bf.search_url(name),name)
+        async def matches():
+            async with bf.closing(bf.stream_pages(list(searches),session)) as pages:
+                async for page in pages:
+                    if not bf.is_valid(page): continue
+                    url = bf.match_search_result(page["html"],searches[page["url"]])
+                    if url: yield url
+        async with bf.closing(bf.stream_profiles(matches(),session)) as profiles:
+            async for profile in profiles:
+                yield profile
+    Logs._log("Names stream finished.")
+
+def iter_top(category:Category=None):
+    """
+    Streaming version of scrape_top. Each Profile is yielded as soon as it's parsed, in the order they finish.
+
+    :category: Enum from Category class to use. E.g. - category = Category.AUTHORS /OR/ category = None = Top 100 list
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_top_async(category))
+
+async def iter_top_async(category:Category=None,session=None):
+    """
+    Async version of iter_top, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    top_url = bf.top_url(category)
+    Logs._log("Streaming profiles from %s toplist ...",category.name if category else "Top 100")
+    async with open_session(session) as session:
+        links = bf.stream_profile_links([top_url],"top_100_list",session)
+        async with bf.closing(bf.stream_profiles(links,session)) as profiles:
+            async for profile in profiles:
+                yield profile
+    Logs._log("Top stream finished.")
+
+def iter_urls(urls):
+    """
+    Streaming version of scrape_urls. Each Profile is yielded as soon as it's parsed, in the order they finish. The URLs can come from a generator (e.g. iter_sitemap) - they are only pulled in as fast as they get downloaded.
+
+    :urls: An iterable of profile page URLs.
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_urls_async(urls))
+
+async def iter_urls_async(urls,session=None):
+    """
+    Async version of iter_urls, for use inside of a running event loop (with 'async for'). Takes the same arguments (the URLs can also be an async iterable), plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    async with open_session(session) as session:
+        async with bf.closing(bf.stream_profiles(urls,session)) as profiles:
+            async for profile in profiles:
+                yield profile
+
+# ---------- Sitemap
+
+def iter_sitemap(since=None):
+    """
+    Go through the site's XML sitemaps and get the URL of every profile on the site, along with when it was last modified. The sitemaps list far more profiles than the categories and maps do, and they're read while downloading (never held in memory whole), so this is the cheapest way to enumerate the whole site. Feed the URLs to scrape_urls/iter_urls to get the profiles themselves, or use iter_sitemap_profiles to do both at once.
+
+    :since: Only get the profiles modified on/after this point - a datetime, date or W3C (ISO 8601) date string of any precision (e.g. '2023-06-01' or '2023-06'). Times without a timezone are taken as UTC. Default (None) means every profile. Great for getting just the profiles that changed since the last run.
+
+    :return: A generator of (URL, lastmod) tuples, where lastmod is the W3C datetime string from the sitemap (or None if it has none).
+    """
+    return bf.iterate(iter_sitemap_async(since))
+
+async def iter_sitemap_async(since=None,session=None):
+    """
+    Async version of iter_sitemap, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of (URL, lastmod) tuples.
+    """
+    async with open_session(session) as session:
+        async with bf.closing(sm.stream_profile_urls(session,since)) as entries:
+            async for entry in entries:
+                yield entry
+
+def iter_sitemap_profiles(since=None):
+    """
+    Get the profiles of every profile URL in the site's sitemaps (see iter_sitemap), optionally only the ones modified since a point in time. URLs are fed into downloading and parsing while the sitemaps are still being read, and each Profile is yielded as soon as it's parsed.
+
+    Note: Without 'since', this is the entire site - tens of thousands of profiles.
+
+    :since: Only get the profiles modified on/after this point - a datetime, date or W3C (ISO 8601) date string of any precision (e.g. '2023-06-01' or '2023-06'). Default (None) means every profile.
+
+    :return: A generator of Profile objects.
+    """
+    return bf.iterate(iter_sitemap_profiles_async(since))
+
+async def iter_sitemap_profiles_async(since=None,session=None):
+    """
+    Async version of iter_sitemap_profiles, for use inside of a running event loop (with 'async for'). Takes the same arguments, plus:
+
+    :session: An optional aiohttp ClientSession to make the requests with. If left out, the session of the open Client is used, or a temporary one is made for this call.
+
+    :return: An async generator of Profile objects.
+    """
+    Logs._log("Streaming profiles from sitemap ...")
+    async with open_session(session) as session:
+        async def urls():
+            async with bf.closing(sm.stream_profile_urls(session,since)) as entries:
+                async for url,lastmod in entries:
+                    yield url
+        async with bf.closing(bf.stream_profiles(urls(),session)) as profiles:
+            async for profile in profiles:
+                yield profile
+    Logs._log("Sitemap stream finished.")
\ No newline at end of file
@@ -1,94 +1,611 @@
 # ---------- Base functionality for the program
 
-import aiohttp
 import asyncio
+import atexit
 import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor,ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime,timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from urllib.parse import urlsplit
+from cnw_scraper.categories import Category
+from cnw_scraper.client import Client,current_session
 from cnw_scraper.logs import Logs
+from cnw_scraper.metrics import Metrics
 from cnw_scraper.options import Options as opt
-from cnw_scraper.profile import Profile
-from bs4 import BeautifulSoup,SoupStrainer
+from cnw_scraper import parsers
+from cnw_scraper.profile import Profile,ProfileList
 
 # Prevents Windows-specific nonsense about "Event loop is closed" with asyncio loop policy
 if os.name == "nt":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-def parse_profile(page_html):
-    # Parse the HTML soup on the profile's page and return the data as a Profile object.
-    Logs._log("Parsing HTML ...",True)
-    soup = BeautifulSoup(page_html,features=opt._PARSER,parse_only=SoupStrainer(attrs={"id":"single__main"}))
-    soup_name = soup.find(attrs={"itemprop":"name"})["content"]
-    soup_stats = soup.find("table",attrs={"class":"celeb_stats_table"})
-    soup_desc = soup.find(attrs={"itemprop":"description"})
-    # Get name first...
-    data = {"Name":soup_name}
-    # Then get the stats from the table, if there.
-    if soup_stats:
-        for table in soup_stats:
-            data.update({table.td.text[:-1]:table.td.next_sibling.text})
-    # If Net Worth exists, change to the numerical representation found on the site, otherwise just give it zero for sanity reasons. Yes, that's right, there are some celebritynetworth.com profiles that don't - *GASP!* - have a net worth listed. Ridiculous, I say!
-    if "Net Worth" in data:
-        data["Net Worth"] = soup.find("meta",attrs={"itemprop":"price"})["content"]
+def parse_profile(page_html,include_description=None,parser=None):
+    # Parse the profile's page and return the data as a Profile object. The options are passed in explicitly when this runs in a worker process, which may not share our Options.
+    if include_description is None:
+        include_description = opt.include_description
+    parser = parser or opt.parser
+    start = time.perf_counter() if Metrics.enabled else None
+    Logs._log("Parsing HTML ...",is_verbose=True)
+    # The description is cut out before parsing, so the parser never has to go through it - it's kept as raw HTML and only parsed if it's read
+    rest,desc = parsers.split_description(page_html)
+    data = parsers.profile_stats(page_html if desc is None else rest,parser)
+    Logs._log("Compiling profile of '%s' ...",data["Name"],is_verbose=True)
+    if not include_description:
+        profile = Profile(data, "")
     else:
-        data["Net Worth"] = "0"
-    # Get description if wanted and available.
-    desc = []
-    if opt.include_description and soup_desc:
-        for tag in soup_desc.children:
-            if tag.name in ["div","img","table","style"]:
-                # Junk data
-                continue
-            if tag.name in ["ul","ol"]:
-                # Go through lists and collect info within
-                for li in tag: desc.append(li.text+'\n\n')
-                continue
-            desc.append(tag.text+'\n\n')
-        desc = "".join(desc)
-    else: desc = ""
-    Logs._log(f"Compiling profile of '{data['Name']}' ...",True)
-    return Profile(data, desc)
+        profile = Profile(data, description_html=page_html if desc is None else desc, parser=parser)
+    if start is not None:
+        Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="parse_profile")
+        Metrics._count("cnw_profiles_parsed_total")
+    return profile
 
-async def fetch(url,session):
+# The pool that parsing gets sent to, along with the options it was made with
+_executor = None
+_executor_key = None
+
+def _get_executor():
+    # Get the parse pool matching the current options, or None if parsing should happen in place
+    global _executor,_executor_key
+    key = (opt.parse_executor,opt.parse_workers)
+    if key != _executor_key:
+        _shutdown_executor()
+        if opt.parse_workers > 0:
+            if opt.parse_executor not in ["process","thread"]:
+                raise Exception("Invalid parse_executor Option - use 'process' or 'thread'.")
+            pool = ProcessPoolExecutor if opt.parse_executor == "process" else ThreadPoolExecutor
+            _executor = pool(max_workers=opt.parse_workers)
+        _executor_key = key
+    return _executor
+
+@atexit.register
+def _shutdown_executor():
+    global _executor,_executor_key
+    if _executor:
+        _executor.shutdown(wait=False)
+    _executor = _executor_key = None
+
+def _parse_one(func,page_html):
+    # Run a parse function over a page, handing back what went wrong as an Exception instead of raising it - so a page that can't be parsed (e.g. a URL that isn't a profile page) doesn't sink the rest of the batch
     try:
-        # Get info and payload from a valid URL
-        async with session.request(method="GET", url=url, timeout=opt._TIMEOUT) as response:
-            html = await response.text()
-            status = response.status
-            data = {"status":status,"url":url,"html":html}
+        return func(page_html)
     except Exception as err:
-        # Kill program if we have a connection error - it is up to the user if they want to re-establish a connection and try again.
-        await asyncio.sleep(0.5)
-        raise err
-    Logs._log(f"Fetched page: '{data['status']}' - {data['url']}",True)
+        return Exception(f"{type(err).__name__}: {err}")
+
+def _parse_chunk(func,chunk):
+    # Run a parse function over a chunk of pages inside a pool worker
+    return [_parse_one(func,html) for html in chunk]
+
+def parse_failed(page,result,failed_urls=None):
+    # Whether a page's parse result is a failure (see _parse_one). If it is, it's logged, the page gets its "error" set and its URL is added to the failed list.
+    if not isinstance(result,Exception):
+        return False
+    page["error"] = f"Couldn't parse page ({result})"
+    Logs._log("FAILED: %s - %s",page["error"],page["url"],url=page["url"],error=page["error"])
+    if failed_urls is not None: failed_urls.append(page["url"])
+    return True
+
+def profile_parser():
+    # The parse_profile function to send to the pool, with the options it needs bound to it
+    return partial(parse_profile,include_description=opt.include_description,parser=opt.parser)
+
+def links_parser(target_id):
+    # The get_profile_links_in_page function to send to the pool, with the options it needs bound to it
+    return partial(get_profile_links_in_page,target_id=target_id,parser=opt.parser)
+
+async def parse_async(func,page_html):
+    # Parse one page with the pool (without blocking the event loop), or in place if there's no pool. A page that can't be parsed gives an Exception instead of raising (see parse_failed).
+    executor = _get_executor()
+    start = time.perf_counter() if Metrics.enabled else None
+    if not executor:
+        result = _parse_one(func,page_html)
+    else:
+        result = await asyncio.get_running_loop().run_in_executor(executor,_parse_one,func,page_html)
+    if start is not None:
+        Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="parse")
+    return result
+
+async def parse_all(func,pages_html):
+    # Parse many pages with the pool, split into a chunk per worker to keep the overhead low. Results come back in the same order as the pages, with an Exception for each page that can't be parsed (see parse_failed).
+    executor = _get_executor()
+    start = time.perf_counter() if Metrics.enabled else None
+    if not executor or len(pages_html) < 2:
+        results = _parse_chunk(func,pages_html)
+    else:
+        loop = asyncio.get_running_loop()
+        size = -(-len(pages_html)//(opt.parse_workers*4))
+        chunks = [pages_html[i:i+size] for i in range(0,len(pages_html),size)]
+        results = [item for chunk in await asyncio.gather(*[loop.run_in_executor(executor,_parse_chunk,func,chunk) for chunk in chunks]) for item in chunk]
+    if start is not None:
+        Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="parse")
+    return results
+
+# Statuses that mean the site is struggling (or throttling us) and the request is worth trying again
+_RETRY_STATUSES = [429,500,502,503,504]
+# The longest a backoff or a Retry-After header can make us wait between tries, in seconds
+_MAX_RETRY_WAIT = 300
+
+async def _request(url,session):
+    # Make one GET request for a page. If the page is cached, ask the site to only send it again if it changed. Also returns how long the site asked us to wait before trying again, if it did.
+    cache = opt._CACHE
+    cached = cache.get(url) if cache else None
+    headers = {}
+    if cached:
+        if cached["etag"]: headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]: headers["If-Modified-Since"] = cached["last_modified"]
+    # Get info and payload from a valid URL
+    sent = time.perf_counter() if Metrics.enabled else None
+    async with session.request(method="GET", url=url, headers=headers, timeout=opt._timeout()) as response:
+        if sent is not None:
+            received = time.perf_counter()
+            Metrics._observe("cnw_wait_seconds",received-sent)
+        if cached and response.status == 304:
+            # Not modified - use the copy on disk
+            return {"status":cached["status"],"url":url,"html":cache.read(url),"cached":True,"error":None},None
+        html = await response.text()
+        status = response.status
+        if sent is not None:
+            Metrics._observe("cnw_download_seconds",time.perf_counter()-received)
+        if cache and status == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            cache.put(url,status,response.headers.get("ETag"),response.headers.get("Last-Modified"),html)
+        retry_after = _retry_after(response.headers.get("Retry-After")) if status in [429,503] else None
+        return {"status":status,"url":url,"html":html,"cached":False,"error":None},retry_after
+
+def _retry_after(value):
+    # Seconds to wait from a Retry-After header, which is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0,float(value))
+    except ValueError:
+        try:
+            return max(0.0,(parsedate_to_datetime(value)-datetime.now(timezone.utc)).total_seconds())
+        except (TypeError,ValueError):
+            return None
+
+def _backoff(attempt,retry_after):
+    # Seconds to wait before trying again - as long as the site asked, or a random amount that grows with each try
+    wait = retry_after if retry_after is not None else random.uniform(0,opt.retry_backoff*2**attempt)
+    return min(wait,_MAX_RETRY_WAIT)
+
+async def fetch(url,session):
+    # Get a page, retrying connection errors and struggling-server statuses with jittered exponential backoff (or as long as the site's Retry-After says). This never raises for a failed page - the page comes back with its "error" set instead, so one bad page doesn't sink the rest of the batch.
+    host = urlsplit(url).hostname
+    attempt = 0
+    start = time.perf_counter()
+    while True:
+        closed_for = _breaker_wait(host)
+        if closed_for:
+            # The host's circuit is open - waiting it out counts as a try, so a short outage doesn't fail every page queued behind it
+            error = f"Too many failures in a row from {host}"
+            if attempt >= opt.retries:
+                data = {"status":0,"url":url,"html":"","cached":False,"error":error}
+                Logs._log("FAILED: Giving up on page after %d tries (%s) - %s",attempt+1,error,url,url=url,error=error)
+                if Metrics.enabled: Metrics._count("cnw_failed_pages_total")
+                break
+            Logs._log("Circuit open for %s, waiting %.1fs - %s",host,closed_for,url,is_verbose=True,url=url,error=error)
+            await asyncio.sleep(closed_for)
+            attempt += 1
+            continue
+        try:
+            data,retry_after = await _request(url,session)
+        except Exception as err:
+            data,retry_after = {"status":0,"url":url,"html":"","cached":False,"error":f"{type(err).__name__}: {err}"},None
+        if Metrics.enabled:
+            Metrics._count("cnw_responses_total",status="error" if data["error"] else data["status"])
+        if not data["error"] and data["status"] not in _RETRY_STATUSES:
+            _breaker_record(host,True)
+            break
+        _breaker_record(host,False)
+        if not data["error"]:
+            data["error"] = f"HTTP {data['status']}"
+        if attempt >= opt.retries:
+            Logs._log("FAILED: Giving up on page after %d tries (%s) - %s",attempt+1,data["error"],url,url=url,status=data["status"],error=data["error"])
+            if Metrics.enabled: Metrics._count("cnw_failed_pages_total")
+            break
+        wait = _backoff(attempt,retry_after)
+        Logs._log("Retrying page in %.1fs (%s) - %s",wait,data["error"],url,is_verbose=True,url=url,status=data["status"],error=data["error"])
+        if Metrics.enabled: Metrics._count("cnw_retries_total")
+        await asyncio.sleep(wait)
+        attempt += 1
+    duration = time.perf_counter()-start
+    Logs._log("Fetched page: '%s'%s - %s",data["status"]," (cached)" if data["cached"] else "",data["url"],is_verbose=True,url=data["url"],status=data["status"],duration=duration)
+    if Metrics.enabled:
+        Metrics._observe("cnw_fetch_seconds",duration)
+        if data["cached"]: Metrics._count("cnw_cache_hits_total")
     return data
 
-async def client(urls):
-    # Asynchronously get the requested pages and return a list of multiple page HTML responses
-    Logs._log("Establishing connection ...",True)
-    ua = opt.custom_user_agent if opt.custom_user_agent else opt._DEFAULT_UA
-    async with aiohttp.ClientSession(headers={"user-agent":ua}) as session:
-        tasks = [fetch(url,session) for url in urls]
-        page_list = await asyncio.gather(*tasks)
-    await asyncio.sleep(0.5) # Graceful shutdown of client connections is needed
-    Logs._log("Collected pages from URLs ...",True)
-    return page_list
-
-def get_pages(urls):
-    # Initialize an async client run to connect to site and collect the HTML data from the supplied URLs
-    Logs._log(f"Requesting ({len(urls)}) page(s) ...",True)
-    pages = asyncio.run(client(urls))
-    Logs._log("Compiling page list ...",True)
-    return list(pages)
-
-def get_profile_links_in_page(base_page,target_id):
-    # Run page through soup and get each listed profile URL inside it
-    profile_list = BeautifulSoup(base_page,features=opt._PARSER,parse_only=SoupStrainer(attrs={"id":target_id}))
-    profile_urls = [a["href"] for a in profile_list.select("a")]
-    return profile_urls
+def is_valid(page):
+    # Whether a page was downloaded and isn't an error page (e.g. an out-of-range 404)
+    return not page["error"] and page["status"] < 400
+
+def split_pages(pages,failed_urls):
+    # Keep only the valid pages, and add the URLs of the ones that failed to download to the failed list (404s and such aren't failures, they are just skipped)
+    failed_urls.extend(page["url"] for page in pages if page["error"])
+    return [page for page in pages if is_valid(page)]
+
+# Circuit breaker state of each host: [failures in a row, time the circuit was opened]
+_breakers = {}
+
+def _breaker_wait(host):
+    # How long (in seconds) requests to a host have to wait, or 0 if one can go now. A host's circuit opens after circuit_breaker_threshold failures in a row, and requests to it wait until circuit_breaker_cooldown seconds have passed. Then one request at a time is let through to test the waters.
+    failures,opened = _breakers.get(host,(0,None))
+    if opened is None or opt.circuit_breaker_threshold <= 0:
+        return 0
+    remaining = opened + opt.circuit_breaker_cooldown - time.time()
+    if remaining <= 0:
+        _breakers[host] = (failures,time.time())
+        return 0
+    return remaining
+
+def _breaker_record(host,success):
+    if success:
+        _breakers.pop(host,None)
+        return
+    failures,opened = _breakers.get(host,(0,None))
+    failures += 1
+    if opt.circuit_breaker_threshold > 0 and failures >= opt.circuit_breaker_threshold:
+        if opened is None:
+            Logs._log("Too many failures in a row from %s, pausing requests to it for %ss ...",host,opt.circuit_breaker_cooldown)
+        opened = time.time()
+    _breakers[host] = (failures,opened)
+
+async def retrying(url,request):
+    # Await request() - which returns (result, status, retry_after) - until it gets a status that isn't worth trying again, retrying connection errors and struggling-server statuses like fetch does (same backoff, Retry-After and circuit breaker). Unlike fetch, this raises if it still fails after Options.retries more tries. A result with a status worth retrying is thrown away, so release anything it holds in request() first.
+    host = urlsplit(url).hostname
+    attempt = 0
+    while True:
+        closed_for = _breaker_wait(host)
+        if closed_for:
+            error,wait = f"Too many failures in a row from {host}",closed_for
+        else:
+            try:
+                result,status,retry_after = await request()
+                error = f"HTTP {status}" if status in _RETRY_STATUSES else None
+            except Exception as err:
+                status,retry_after,error = "error",None,f"{type(err).__name__}: {err}"
+            if Metrics.enabled:
+                Metrics._count("cnw_responses_total",status=status)
+            _breaker_record(host,not error)
+            if not error: return result
+            wait = _backoff(attempt,retry_after)
+        if attempt >= opt.retries:
+            if Metrics.enabled: Metrics._count("cnw_failed_pages_total")
+            raise Exception(f"Couldn't get {url} after {attempt+1} tries ({error})")
+        Logs._log("Retrying in %.1fs (%s) - %s",wait,error,url,is_verbose=True,url=url,error=error)
+        if Metrics.enabled: Metrics._count("cnw_retries_total")
+        await asyncio.sleep(wait)
+        attempt += 1
+
+async def probe(url,session):
+    # Check whether a page exists without downloading it - with a HEAD request, or a GET if the site doesn't allow HEAD. Only a 404/410 means it doesn't. Struggling-server statuses and connection errors are tried again, and raise if they don't clear up, since guessing would quietly cut a category short.
+    async def request():
+        async with session.request(method="HEAD", url=url, allow_redirects=True, timeout=opt._timeout()) as response:
+            status,headers = response.status,response.headers
+        if status in [403,405,501]:
+            async with session.request(method="GET", url=url, timeout=opt._timeout()) as response:
+                status,headers = response.status,response.headers
+        return status,status,_retry_after(headers.get("Retry-After")) if status in [429,503] else None
+    status = await retrying(url,request)
+    Logs._log("Probed page: '%s' - %s",status,url,is_verbose=True,url=url,status=status)
+    return status not in [404,410]
+
+# Last known page of each category, along with when it was found
+_last_pages = {}
+# Highest page number find_last_page will probe - far more pages than any category has
+_MAX_PAGES = 2**14
+
+async def find_last_page(category,session):
+    # Find the last valid page of a category in a few probes: double the page number until one doesn't exist, then binary search between the last two. Results are remembered for Options.page_count_ttl seconds. Raises if pages keep existing up to _MAX_PAGES (e.g. the site answers out-of-range pages by redirecting them to page 1), since the search would never end otherwise.
+    if category in _last_pages:
+        last_page,found = _last_pages[category]
+        if time.time() - found < opt.page_count_ttl:
+            return last_page
+    exists = lambda page: probe(category_urls(category,page,page)[0],session)
+    last_page = 0
+    if await exists(1):
+        low,high = 1,2
+        while await exists(high):
+            if high >= _MAX_PAGES:
+                raise Exception(f"{category.name} category still has pages at page {high} - the site seems to answer out-of-range pages, so its last page can't be found")
+            low,high = high,high*2
+        while high - low > 1:
+            mid = (low+high)//2
+            if await exists(mid): low = mid
+            else: high = mid
+        last_page = low
+    Logs._log("Found %d page(s) in %s category ...",last_page,category.name)
+    _last_pages[category] = (last_page,time.time())
+    return last_page
+
+def _host_slot(host_slots,url):
+    # Get the semaphore that limits the number of in-flight requests to the URL's host
+    host = urlsplit(url).hostname
+    if host not in host_slots:
+        host_slots[host] = asyncio.Semaphore(max(1,opt.max_connections_per_host))
+    return host_slots[host]
+
+async def schedule(urls,session):
+    # Hand the URLs out from a queue to a bounded pool of workers, so that no more than max_connections requests are in-flight at once (and no more than max_connections_per_host for any one host). Pages come back in the same order as the URLs.
+    queue = asyncio.Queue()
+    for item in enumerate(urls):
+        queue.put_nowait(item)
+    pages = [None]*len(urls)
+    host_slots = {}
+    async def worker():
+        while not queue.empty():
+            i,url = queue.get_nowait()
+            async with _host_slot(host_slots,url):
+                pages[i] = await fetch(url,session)
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(max(1,opt.max_connections),len(urls)))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # Don't leave the other workers running if one of them failed
+        for w in workers: w.cancel()
+    return pages
+
+async def stream_pages(urls,session,parse=None):
+    # Like schedule, but takes any iterable (or async iterable) of URLs and yields each page as soon as it arrives, in no particular order. URLs are pulled in only as fast as the workers can take them and finished pages wait in a bounded queue, so memory depends on max_connections and not on the number of URLs. If a parse function is given, each valid page is run through it (with the parse pool, if there is one) by the worker that fetched it, and the result is stored in the page under "parsed" - or the page gets its "error" set if it can't be parsed.
+    limit = max(1,opt.max_connections)
+    todo = asyncio.Queue(maxsize=limit)
+    done = asyncio.Queue(maxsize=limit)
+    host_slots = {}
+    async def feed():
+        try:
+            if hasattr(urls,"__aiter__"):
+                async for url in urls: await todo.put(url)
+            else:
+                for url in urls: await todo.put(url)
+            for _ in range(limit): await todo.put(None)
+        except Exception as err:
+            await done.put(err)
+        finally:
+            if hasattr(urls,"aclose"): await urls.aclose()
+    async def worker():
+        try:
+            url = await todo.get()
+            while url is not None:
+                async with _host_slot(host_slots,url):
+                    page = await fetch(url,session)
+                if parse and is_valid(page):
+                    parsed = await parse_async(parse,page["html"])
+                    if not parse_failed(page,parsed): page["parsed"] = parsed
+                await done.put(page)
+                url = await todo.get()
+            await done.put(None)
+        except Exception as err:
+            await done.put(err)
+    tasks = [asyncio.ensure_future(feed())] + [asyncio.ensure_future(worker()) for _ in range(limit)]
+    try:
+        finished = 0
+        while finished < limit:
+            page = await done.get()
+            if page is None:
+                finished += 1
+            elif isinstance(page,Exception):
+                raise page
+            else:
+                yield page
+    finally:
+        # Stop the workers (e.g. if the consumer stopped early) and wait for them to wind down
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks,return_exceptions=True)
+
+@asynccontextmanager
+async def closing(agen):
+    # Make sure an async generator gets closed (stopping its downloads) when the block exits, even if it wasn't used up. An 'async for' alone leaves it suspended, still holding on to the session. Same as contextlib.aclosing, which needs Python 3.10.
+    try:
+        yield agen
+    finally:
+        await agen.aclose()
+
+async def stream_profile_links(listing_urls,target_id,session):
+    # Yield the profile links from each listing page as soon as the page arrives, skipping invalid (404) pages
+    async with closing(stream_pages(listing_urls,session,links_parser(target_id))) as pages:
+        async for page in pages:
+            for url in page.get("parsed",[]):
+                yield url
+
+async def stream_profiles(profile_urls,session):
+    # Fetch and parse profiles from an iterable (or async iterable) of URLs, yielding each Profile as soon as it's parsed
+    async with closing(stream_pages(profile_urls,session,profile_parser())) as pages:
+        async for page in pages:
+            if "parsed" in page:
+                page["parsed"].url = page["url"]
+                yield page["parsed"]
+
+async def get_pages_async(urls):
+    # Collect the HTML data from the supplied URLs with the session that's in scope
+    Logs._log("Requesting (%d) page(s) ...",len(urls),is_verbose=True)
+    start = time.perf_counter() if Metrics.enabled else None
+    pages = await schedule(urls,current_session())
+    if start is not None:
+        Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="get_pages")
+        Metrics._count("cnw_pages_total",len(urls),stage="get_pages")
+    Logs._log("Collected pages from URLs ...",is_verbose=True)
+    return pages
+
+async def pages_as_done(urls,failed_urls,parse=None):
+    # Like get_pages_async, but yield each page (parsed with the parse function, if there is one - see stream_pages) as soon as it's done, in no particular order, so it can be recorded right away instead of after the whole batch. Pages that failed to download or couldn't be parsed aren't yielded - their URLs get added to the failed list, in URL order, once all the pages are done.
+    Logs._log("Requesting (%d) page(s) ...",len(urls),is_verbose=True)
+    start = time.perf_counter() if Metrics.enabled else None
+    failed = set()
+    async with closing(stream_pages(urls,current_session(),parse)) as pages:
+        async for page in pages:
+            if page["error"]: failed.add(page["url"])
+            else: yield page
+    failed_urls.extend(url for url in urls if url in failed)
+    if start is not None:
+        Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="get_pages")
+        Metrics._count("cnw_pages_total",len(urls),stage="get_pages")
+    Logs._log("Collected pages from URLs ...",is_verbose=True)
+
+async def collect_links(listing_urls,target_id,failed_urls,journal=None):
+    # Get the profile links from each listing page, in page order. Pages already in the journal aren't downloaded again, and each new one gets recorded in it as soon as it's done. Invalid (404) pages have no links.
+    links = {url:journal.get("listing",url) for url in listing_urls if journal is not None and journal.has("listing",url)}
+    async for page in pages_as_done([url for url in listing_urls if url not in links],failed_urls,links_parser(target_id)):
+        links[page["url"]] = page.get("parsed",[])
+        if journal is not None: journal.record("listing",page["url"],links[page["url"]])
+    return [url for listing_url in listing_urls for url in links.get(listing_url,[])]
+
+# Recent name searches (search URL -> matching profile URL, or None if nothing matched), along with when they were done, least recently used first
+_searches = OrderedDict()
+
+def _remember_search(url,match):
+    # Remember the result of a search, forgetting the least recently used ones past Options.search_memo_size
+    if opt.search_memo_size <= 0: return
+    _searches[url] = (match,time.time())
+    _searches.move_to_end(url)
+    while len(_searches) > opt.search_memo_size:
+        _searches.popitem(last=False)
+
+def _recall_search(url):
+    # Get a remembered search as (True, match), or (False, None) if it isn't remembered (or is older than Options.search_memo_ttl)
+    if opt.search_memo_size <= 0 or url not in _searches:
+        return False,None
+    match,found = _searches[url]
+    if time.time() - found >= opt.search_memo_ttl:
+        del _searches[url]
+        return False,None
+    _searches.move_to_end(url)
+    return True,match
+
+async def collect_searches(names,failed_urls,journal=None,index=None):
+    # Search for each name and get the profile URLs of the ones that match, in name order. Names are looked up in the index, the remembered searches and the journal first, and only the ones that aren't in any of them get searched for on the site. Each new search gets remembered and recorded in the journal as soon as it's done, and matches get added to the index.
+    search_urls = [search_url(name) for name in names]
+    matches = {}
+    for url,name in zip(search_urls,names):
+        if url in matches: continue
+        match = index.lookup(name) if index is not None else None
+        remembered,remembered_match = _recall_search(url)
+        if match: matches[url] = match
+        elif remembered: matches[url] = remembered_match
+        elif journal is not None and journal.has("search",url): matches[url] = journal.get("search",url)
+    # Names that end up with the same search URL share one search, matched against the first of them
+    todo = {}
+    for url,name in zip(search_urls,names):
+        if url not in matches: todo.setdefault(url,name)
+    Logs._log("Found %d name(s) without searching, searching for %d ...",len(matches),len(todo),is_verbose=True)
+    async for page in pages_as_done(list(todo),failed_urls):
+        match = matches[page["url"]] = match_search_result(page["html"],todo[page["url"]]) if is_valid(page) else None
+        _remember_search(page["url"],match)
+        if journal is not None: journal.record("search",page["url"],match)
+        if index is not None and match: index.add(todo[page["url"]],match)
+    return [matches[url] for url in search_urls if matches.get(url)]
+
+async def collect_profiles(profile_urls,failed_urls,journal=None):
+    # Get and parse the profiles, in URL order. Each URL is only downloaded once, even if it's in the list more than once. Profiles already in the journal aren't downloaded again, and each new one gets recorded in it as soon as it's parsed. Invalid (404) pages are skipped.
+    profiles = {url:journal.get("profile",url) for url in profile_urls if journal is not None and journal.has("profile",url)}
+    profiles = {url:Profile.from_dict(data) if data else None for url,data in profiles.items()}
+    async for page in pages_as_done(list(dict.fromkeys(url for url in profile_urls if url not in profiles)),failed_urls,profile_parser()):
+        profile = profiles[page["url"]] = page.get("parsed")
+        if profile: profile.url = page["url"]
+        if journal is not None: journal.record("profile",page["url"],profile.to_dict(raw_description=True) if profile else None)
+    return [profiles[url] for url in profile_urls if profiles.get(url)]
+
+def run(coro):
+    # Run a coroutine from synchronous code - on the open Client's loop if there is one, otherwise on a new loop for just this call
+    if Client._current:
+        return Client._current._run(coro)
+    return asyncio.run(coro)
+
+def iterate(agen):
+    # Drive an async generator from synchronous code one item at a time - on the open Client's loop if there is one, otherwise on a new loop that lives as long as the generator
+    client = Client._current
+    loop = client._loop if client else asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        try:
+            loop.run_until_complete(agen.aclose())
+        finally:
+            if not client:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+
+def category_urls(category,starting_page,ending_page):
+    # URLs of a category's pages, from start to end (inclusive)
+    base_url = opt._SITE_URL + "/category/" + category.value + "/page/"
+    return [base_url+str(i)+"/" for i in range(starting_page,ending_page+1)]
+
+def canonical_url(url):
+    # The one form of a URL that all of its variants (http/https, with or without 'www.', different case, missing trailing slash, query string, fragment) turn into, so the same profile is never fetched twice. Only the site's own URLs get the full treatment.
+    bare = lambda host: host[4:] if host.startswith("www.") else host
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    site = urlsplit(opt._SITE_URL)
+    if bare(host) != bare(site.netloc.lower()):
+        return parts._replace(scheme=parts.scheme.lower(),netloc=host,fragment="").geturl()
+    path = parts.path.lower() or "/"
+    if not path.endswith("/"):
+        path += "/"
+    return f"{site.scheme}://{site.netloc}{path}"
+
+def map_url(location):
+    # URL of a location on the site's map
+    return opt._SITE_URL + "/map/" + location.value + "/"
+
+def top_url(category):
+    # URL of the top 50 list of a category, or the top 100 overall list if there's no category
+    if category:
+        # Check if there's a category and assign the appropriate URL
+        if not isinstance(category,Category):
+            raise Exception("Invalid Category Parameter")
+        return opt._SITE_URL + "/list/top-50-" + category.value + "/"
+    return opt._SITE_URL + "/list/top-100-richest-people-in-the-world/"
+
+def clean_name(name):
+    # Strip everything but alphanumerics/spaces/hyphens/apostrophes from a name
+    valid_chars = lambda c: c.isalnum() or any([x in c for x in [" ","-","'"]])
+    return "".join(filter(valid_chars, name)).strip()
+
+def search_url(name):
+    # URL of the site's search results for a name
+    query = clean_name(name).replace(" ", "-").replace("'","")
+    return opt._SITE_URL + "/dl/" + query.lower() + "/"
+
+def match_search_result(page_html,name):
+    # Get the profile URL of the lead search result on the page, if its contents have the searched name
+    lead = parsers.search_lead(page_html,opt.parser)
+    if lead:
+        # There's a lead search result, check if the contents have our target's name
+        txt = lead[0].lower()
+        if all([x in txt for x in clean_name(name).lower().split()]):
+            # It does - get the target's profile url
+            Logs._log("FOUND: '%s' matches with result.",name,is_verbose=True)
+            return lead[1]
+        Logs._log("FAILED: '%s' doesn't seem to match search result.",name,is_verbose=True)
+    else:
+        Logs._log("FAILED: Search for '%s' returned no results.",name,is_verbose=True)
+    return None
+
+def get_profile_links_in_page(base_page,target_id,parser=None):
+    # Get each listed profile URL inside the page
+    return parsers.profile_links(base_page,target_id,parser or opt.parser)
+
+def wrap_up(profiles,failed_urls,sort_by,sort_ascending):
+    # Sort the profiles and hand them back along with the pages that failed
+    if failed_urls:
+        Logs._log("%d page(s) couldn't be downloaded or parsed - see failed_urls ...",len(failed_urls))
+    return ProfileList(sort_profiles(profiles,sort_by,sort_ascending),failed_urls)
 
 def sort_profiles(profiles,sort_by,sort_ascending):
     if sort_by and sort_by in ["name","worth"]:
         # Key to sort by either profile name or net worth
-        k = lambda x: x.stats["Name"] if sort_by == "name" else int(x.stats["Net Worth"])
-        Logs._log(f"Sorting Profiles by {sort_by.capitalize()} ({'Ascending' if sort_ascending else 'Descending'}) ...")
+        k = lambda x: x.name if sort_by == "name" else x.net_worth
+        Logs._log("Sorting Profiles by %s (%s) ...",sort_by.capitalize(),"Ascending" if sort_ascending else "Descending")
+        start = time.perf_counter() if Metrics.enabled else None
         profiles = sorted(profiles,key=k,reverse=not sort_ascending)
+        if start is not None:
+            Metrics._observe("cnw_stage_seconds",time.perf_counter()-start,stage="sort")
     return profiles
\ No newline at end of file
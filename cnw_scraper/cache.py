@@ -0,0 +1,102 @@
+import sqlite3
+import time
+import zlib
+from cnw_scraper.logs import Logs
+
+class ResponseCache:
+    """
+    An on-disk cache of the pages downloaded from the site, kept in a SQLite database with compressed page bodies. This object isn't created directly, but rather through Options.set_cache.
+
+    When a page is in the cache, the site is asked whether it changed since then (using the ETag/Last-Modified headers it sent last time). If it didn't, the site answers with a short 'not modified' response and the page is read from disk instead, so re-scraping mostly unchanged profiles moves very little data.
+
+    :path: Path of the SQLite database file.
+
+    :ttl: How long (in seconds) a page can stay in the cache without being refreshed before it gets thrown out.
+
+    :max_size: How big (in bytes, compressed) the cached pages can get in total before the least recently used ones get thrown out.
+    """
+    # How many pages get stored between checks of the total size
+    _EVICT_EVERY = 100
+
+    def __init__(self,path:str,ttl:float,max_size:int):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._puts = 0
+        self._db = sqlite3.connect(path,check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, status INTEGER, etag TEXT, last_modified TEXT,"
+            "body BLOB, size INTEGER, stored REAL, used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._db.commit()
+        self.evict()
+
+    def get(self,url):
+        # Get the cached entry for a URL as a dict (with the validators to send to the site), or None if there isn't a fresh one
+        row = self._db.execute("SELECT status,etag,last_modified,stored FROM responses WHERE url=?",(url,)).fetchone()
+        if not row:
+            return None
+        if time.time() - row[3] > self.ttl:
+            self._db.execute("DELETE FROM responses WHERE url=?",(url,))
+            self._db.commit()
+            return None
+        return {"status":row[0],"etag":row[1],"last_modified":row[2]}
+
+    def read(self,url):
+        # Get the page body of a cached URL and mark it as fresh again (the site said it didn't change)
+        now = time.time()
+        row = self._db.execute("SELECT body FROM responses WHERE url=?",(url,)).fetchone()
+        self._db.execute("UPDATE responses SET stored=?,used=? WHERE url=?",(now,now,url))
+        self._db.commit()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self,url,status,etag,last_modified,html):
+        # Store a page, replacing any older version of it
+        now = time.time()
+        body = zlib.compress(html.encode("utf-8"))
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (url,status,etag,last_modified,body,size,stored,used) VALUES (?,?,?,?,?,?,?,?)",
+            (url,status,etag,last_modified,body,len(body),now,now))
+        self._db.commit()
+        self._puts += 1
+        if self._puts % self._EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """
+        Throw out the pages that are older than the TTL, then the least recently used ones until the cache fits into max_size. This runs on its own every so often.
+
+        :return: None.
+        """
+        self._db.execute("DELETE FROM responses WHERE stored<?",(time.time()-self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size),0) FROM responses").fetchone()[0]
+        if total > self.max_size:
+            # Walk from the least recently used page and find where the cut-off is
+            cutoff = None
+            for used,size in self._db.execute("SELECT used,size FROM responses ORDER BY used"):
+                total -= size
+                cutoff = used
+                if total <= self.max_size: break
+            self._db.execute("DELETE FROM responses WHERE used<=?",(cutoff,))
+            Logs._log("Evicted old pages from the cache ...",is_verbose=True)
+        self._db.commit()
+
+    def clear(self):
+        """
+        Throw out every cached page.
+
+        :return: None.
+        """
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+    def close(self):
+        """
+        Close the database. The cache can't be used afterwards.
+
+        :return: None.
+        """
+        self._db.close()
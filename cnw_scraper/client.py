@@ -0,0 +1,143 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from cnw_scraper.logs import Logs
+from cnw_scraper.metrics import Metrics
+from cnw_scraper.options import Options as opt
+
+# The session that the scrape functions should use, if one has been opened by a Client (or passed in by the caller)
+_current_session = ContextVar("cnw_current_session",default=None)
+
+def new_session():
+    # Create an aiohttp session using the connection limits and user-agent from the options. Must be called inside a running event loop.
+    import aiohttp
+    ua = opt.custom_user_agent if opt.custom_user_agent else opt._DEFAULT_UA
+    connector = aiohttp.TCPConnector(limit=max(1,opt.max_connections),limit_per_host=max(1,opt.max_connections_per_host))
+    trace_configs = [Metrics._trace_config()] if Metrics.enabled else None
+    return aiohttp.ClientSession(headers={"user-agent":ua},connector=connector,trace_configs=trace_configs)
+
+@asynccontextmanager
+async def open_session(session=None):
+    # Yield the given session, the one already in scope, or a temporary one that gets closed afterwards
+    if session is None:
+        session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+    Logs._log("Establishing connection ...",is_verbose=True)
+    async with new_session() as session:
+        yield session
+    await asyncio.sleep(0.5) # Graceful shutdown of client connections is needed
+
+@asynccontextmanager
+async def session_scope(session=None):
+    # Like open_session, but also make the session available to everything awaited inside this block
+    async with open_session(session) as session:
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
+
+def current_session():
+    # The session in scope for the running task, if any
+    return _current_session.get()
+
+class Client:
+    """
+    A long-lived connection to the site that can be shared by every scrape function. Normally each scrape function opens its own event loop and connections, then closes them (with a short delay) once it's done. Inside of a Client, all scrape functions share one event loop and one pool of keep-alive connections instead, so back-to-back scrapes reuse warm connections and don't wait on shutdown each time.
+
+    Use it as a context manager and call the scrape functions as normal inside of it. E.g. -
+
+        with Client():
+            actors = scrape_category(Category.ACTORS)
+            authors = scrape_category(Category.AUTHORS)
+
+    Inside of a running event loop (e.g. an aiohttp/FastAPI service), use it as an async context manager with the *_async scrape functions instead. The Client then runs on the caller's loop. E.g. -
+
+        async with Client():
+            actors, authors = await asyncio.gather(
+                scrape_category_async(Category.ACTORS),
+                scrape_category_async(Category.AUTHORS))
+
+    Note: Only one Client can be open at a time with 'with'. Options that affect connections (user-agent, connection limits) are read when the Client is opened.
+    """
+    _current = None
+
+    def __init__(self):
+        self._loop = None
+        self._session = None
+        self._token = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        if self.is_open:
+            raise Exception("This Client is already open.")
+        Logs._log("Opening client ...")
+        self._session = new_session()
+        self._token = _current_session.set(self._session)
+        return self
+
+    async def __aexit__(self,*exc_info):
+        Logs._log("Closing client ...")
+        _current_session.reset(self._token)
+        try:
+            await self._session.close()
+            await asyncio.sleep(0.25) # Graceful shutdown of client connections is needed
+        finally:
+            self._session = self._token = None
+
+    @property
+    def is_open(self):
+        return self._session is not None
+
+    @property
+    def session(self):
+        """
+        The underlying aiohttp ClientSession, or None if the Client isn't open.
+        """
+        return self._session
+
+    def open(self):
+        """
+        Open the event loop and connection pool. Called automatically when used as a context manager.
+
+        :return: None.
+        """
+        if Client._current or self.is_open:
+            raise Exception("A Client is already open.")
+        Logs._log("Opening client ...")
+        self._loop = asyncio.new_event_loop()
+        self._session = self._loop.run_until_complete(self._open_session())
+        self._token = _current_session.set(self._session)
+        Client._current = self
+
+    def close(self):
+        """
+        Close the connection pool and event loop. Called automatically when used as a context manager.
+
+        :return: None.
+        """
+        if self._loop is None: return
+        Logs._log("Closing client ...")
+        _current_session.reset(self._token)
+        Client._current = None
+        try:
+            self._loop.run_until_complete(self._session.close())
+            self._loop.run_until_complete(asyncio.sleep(0.25)) # Graceful shutdown of client connections is needed
+        finally:
+            self._loop.close()
+            self._loop = self._session = self._token = None
+
+    def _run(self,coro):
+        # Run a coroutine to completion on the Client's event loop
+        return self._loop.run_until_complete(coro)
+
+    async def _open_session(self):
+        return new_session()
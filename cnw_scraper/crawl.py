@@ -0,0 +1,526 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import zlib
+from abc import ABC,abstractmethod
+import cnw_scraper.base_functions as bf
+from cnw_scraper.categories import Category
+from cnw_scraper.client import Client,_current_session,current_session,session_scope
+from cnw_scraper.locations import Location
+from cnw_scraper.logs import Logs
+from cnw_scraper.metrics import Metrics
+from cnw_scraper.options import Options as opt
+from cnw_scraper.profile import Profile
+
+# States of a task in a work queue
+PENDING,LEASED,DONE,FAILED = 0,1,2,3
+_STATES = {PENDING:"pending",LEASED:"leased",DONE:"done",FAILED:"failed"}
+
+def shard_of(url,shards):
+    # Which shard a URL belongs to - the same on every machine and every run
+    return zlib.crc32(url.encode("utf-8")) % shards
+
+class WorkQueue(ABC):
+    """
+    The frontier of a Crawl: every URL it has found, and whether it's been done yet. This is the abstract base class for queue backends (a backend has to have every method but close) - SqliteQueue is the one that comes with this package. To spread a crawl over several machines, subclass this with the same methods on top of something they can all reach (e.g. a SQL or Redis server).
+
+    Each task is a (url, kind, data) tuple, where kind is 'listing' (a page of profile links, data is the id of the element they are in), 'search' (a search page, data is the name searched for) or 'profile' (a profile page). Every task is in one of the shards (see shard_of), so workers can be set to only take the tasks of some of them.
+
+    :shards: How many shards the URLs are split into.
+    """
+    shards = 1
+
+    @abstractmethod
+    def put(self,tasks):
+        """
+        Add tasks to the queue. Tasks whose URL was ever in the queue before are ignored, so every URL is only visited once.
+
+        :tasks: An iterable of (url, kind, data) tuples.
+
+        :return: None.
+        """
+
+    @abstractmethod
+    def take(self,worker:str,count:int,shards=None,lease:float=300.0):
+        """
+        Lease pending tasks to a worker. Tasks whose lease ran out (e.g. their worker died) are pending again.
+
+        :worker: Name of the worker taking the tasks.
+
+        :count: The most tasks to take.
+
+        :shards: Only take tasks from these shards (an iterable of shard numbers). Default (None) means any shard.
+
+        :lease: How long (in seconds) the worker has to finish the tasks before they are handed to someone else.
+
+        :return: A list of (url, kind, data) tuples - empty if there's nothing to take right now.
+        """
+
+    @abstractmethod
+    def done(self,urls):
+        """
+        Mark leased tasks as done.
+
+        :urls: URLs of the tasks.
+
+        :return: None.
+        """
+
+    @abstractmethod
+    def fail(self,urls,retries:int,error:str=""):
+        """
+        Hand leased tasks back after they failed, to be tried again - or mark them as failed for good once they've been tried more than retries times.
+
+        :urls: URLs of the tasks.
+
+        :retries: How many times a task can be tried again.
+
+        :error: What went wrong.
+
+        :return: None.
+        """
+
+    @abstractmethod
+    def counts(self,shards=None):
+        """
+        Count the tasks in each state.
+
+        :shards: Only count the tasks of these shards. Default (None) means all of them.
+
+        :return: A dict of state ('pending', 'leased', 'done' or 'failed') -> number of tasks.
+        """
+
+    @abstractmethod
+    def failed_urls(self):
+        """
+        :return: A list of the URLs that failed for good.
+        """
+
+    def close(self):
+        """
+        Close the queue's connections.
+
+        :return: None.
+        """
+
+class SqliteQueue(WorkQueue):
+    """
+    A work queue kept in a SQLite database file, for crawling with any number of processes on one machine (or machines sharing a disk that SQLite can lock properly - not a network share). Nothing needs to be running besides the workers, and the queue outlives them, so a crawl can be stopped and picked up again any time.
+
+    It can be passed to worker processes as is - each process opens its own connection to the file.
+
+    :path: Path of the database file (created if it isn't there).
+
+    :shards: How many shards the URLs are split into. Only used when the database is made - an existing one keeps its own.
+    """
+
+    def __init__(self, path:str, shards:int=16):
+        self.path = path
+        self._db = None
+        self._pid = None
+        db = self._connection()
+        db.execute("INSERT OR IGNORE INTO meta VALUES ('shards',?)",(str(max(1,shards)),))
+        self.shards = int(db.execute("SELECT value FROM meta WHERE key='shards'").fetchone()[0])
+
+    def __getstate__(self):
+        # Connections can't be sent to other processes - they open their own
+        state = dict(self.__dict__)
+        state["_db"] = None
+        return state
+
+    def _connection(self):
+        # The connection of this process, opened on first use (a forked process can't use its parent's)
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path,timeout=60,isolation_level=None,check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "url TEXT PRIMARY KEY, kind TEXT, data TEXT, shard INTEGER, state INTEGER,"
+                "worker TEXT, lease_until REAL, attempts INTEGER, error TEXT)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, shard)")
+            self._pid = os.getpid()
+        return self._db
+
+    def _write(self,query,rows):
+        # Run a statement for many rows in one transaction
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(query,rows)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def put(self,tasks):
+        self._write(
+            "INSERT OR IGNORE INTO tasks VALUES (?,?,?,?,?,NULL,0,0,NULL)",
+            [(url,kind,data,shard_of(url,self.shards),PENDING) for url,kind,data in tasks])
+
+    def take(self,worker:str,count:int,shards=None,lease:float=300.0):
+        db = self._connection()
+        now = time.time()
+        where = "(state=? OR (state=? AND lease_until<?))"
+        args = [PENDING,LEASED,now]
+        if shards is not None:
+            shards = list(shards)
+            where += f" AND shard IN ({','.join('?'*len(shards))})"
+            args += shards
+        # Taking the write lock first makes sure no other worker can take the same tasks in between
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            tasks = db.execute(f"SELECT url,kind,data FROM tasks WHERE {where} LIMIT ?",args+[count]).fetchall()
+            db.executemany(
+                "UPDATE tasks SET state=?,worker=?,lease_until=?,attempts=attempts+1 WHERE url=?",
+                [(LEASED,worker,now+lease,task[0]) for task in tasks])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return tasks
+
+    def done(self,urls):
+        self._write("UPDATE tasks SET state=?,error=NULL WHERE url=?",[(DONE,url) for url in urls])
+
+    def fail(self,urls,retries:int,error:str=""):
+        self._write(
+            "UPDATE tasks SET state=CASE WHEN attempts>? THEN ? ELSE ? END,error=? WHERE url=?",
+            [(retries,FAILED,PENDING,error,url) for url in urls])
+
+    def counts(self,shards=None):
+        query,args = "SELECT state,COUNT(*) FROM tasks",[]
+        if shards is not None:
+            shards = list(shards)
+            query += f" WHERE shard IN ({','.join('?'*len(shards))})"
+            args = shards
+        counts = {name:0 for name in _STATES.values()}
+        for state,count in self._connection().execute(query+" GROUP BY state",args):
+            counts[_STATES[state]] = count
+        return counts
+
+    def failed_urls(self):
+        return [row[0] for row in self._connection().execute("SELECT url FROM tasks WHERE state=?",(FAILED,))]
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+class Sink(ABC):
+    """
+    Where a Crawl's workers put the profiles they parse. This is the abstract base class for sinks (a sink has to have write) - SqliteSink is the one that comes with this package. Subclass it to send the profiles somewhere else (a database server, a message queue, etc.).
+    """
+
+    @abstractmethod
+    def write(self,profiles):
+        """
+        Store parsed profiles. A profile can be written more than once (e.g. when a worker's lease ran out just as it finished), so writing one whose URL is already stored should replace it.
+
+        :profiles: A list of Profile objects.
+
+        :return: None.
+        """
+
+    def close(self):
+        """
+        Close the sink's connections.
+
+        :return: None.
+        """
+
+class SqliteSink(Sink):
+    """
+    Keeps the profiles of a crawl in a SQLite database file (one row per profile URL, so every profile is in it once), which any number of worker processes on the machine can write to at the same time. It can be the same file as the SqliteQueue's. Read the profiles back with profiles, e.g. into a table -
+
+        table = ProfileTable.from_profiles(sink.profiles())
+
+    :path: Path of the database file (created if it isn't there).
+    """
+
+    def __init__(self, path:str):
+        self.path = path
+        self._db = None
+        self._pid = None
+        self._connection()
+
+    def __getstate__(self):
+        # Connections can't be sent to other processes - they open their own
+        state = dict(self.__dict__)
+        state["_db"] = None
+        return state
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def _connection(self):
+        # The connection of this process, opened on first use (a forked process can't use its parent's)
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path,timeout=60,check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS profiles (url TEXT PRIMARY KEY, data TEXT, stored REAL)")
+            self._db.commit()
+            self._pid = os.getpid()
+        return self._db
+
+    def write(self,profiles):
+        db = self._connection()
+        now = time.time()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO profiles VALUES (?,?,?)",[(profile.url,json.dumps(profile.to_dict(raw_description=True)),now) for profile in profiles])
+
+    def profiles(self):
+        """
+        Read the stored profiles back, a few at a time.
+
+        :return: A generator of Profile objects.
+        """
+        for (data,) in self._connection().execute("SELECT data FROM profiles"):
+            yield Profile.from_dict(json.loads(data))
+
+    def close(self):
+        if self._db is not None and self._pid == os.getpid():
+            self._db.close()
+        self._db = None
+
+def _settings():
+    # The settings in Options, Logs and Metrics, for worker processes to start with (they might not be forked copies of this one). Metrics hooks aren't passed on, and each worker keeps its own measurements.
+    options = {name:value for name,value in vars(opt).items() if not name.startswith("__") and not isinstance(value,classmethod) and name not in ["_CACHE","_TIMEOUT"]}
+    cache = opt._CACHE
+    log_file = (Logs._file.baseFilename,Logs._file.formatter) if Logs._file else None
+    return options,(cache.path,cache.ttl,cache.max_size) if cache else None,(Logs.print_to_console,Logs.verbose,log_file),Metrics.enabled
+
+def _run_worker(crawl,settings,shards,worker):
+    # Entry point of a worker process - set the options, logs and metrics up like the parent's and work until the frontier is empty
+    options,cache,(print_to_console,verbose,log_file),metrics = settings
+    for name,value in options.items():
+        setattr(opt,name,value)
+    # A forked copy of the parent's cache connection can't be used here, so open a new one
+    opt._CACHE = None
+    if cache: opt.set_cache(*cache)
+    Logs.print_to_console,Logs.verbose = print_to_console,verbose
+    # A spawned worker adds to the parent's log file, instead of starting it over (a forked one already has it)
+    if log_file and not Logs._file:
+        Logs._file = logging.FileHandler(log_file[0],mode="a",encoding="utf-8")
+        Logs._file.setFormatter(log_file[1])
+        Logs._restart()
+    Metrics.enabled = metrics
+    # A forked worker has a copy of the parent's open Client (its event loop and session, with the parent's connections) - drop it, so the worker makes its own
+    Client._current = None
+    _current_session.set(None)
+    crawl.work(shards,worker)
+
+class Crawl:
+    """
+    A crawl of the site that can be split between many worker processes (and machines). The URLs to visit - the frontier - are kept in a WorkQueue, split into shards: add places to start from (categories, map locations, top lists, names or profile URLs), then run workers. Each worker leases a batch of tasks from the queue, downloads and parses them, adds the profile links it finds back to the queue and writes the profiles to the Sink. Every URL goes into the queue once, so no page is visited twice, no matter how many workers there are or which one found it. E.g. -
+
+        crawl = Crawl(SqliteQueue("./site.crawl"), SqliteSink("./site.crawl"))
+        for category in Category:
+            crawl.add_category(category, 1, "auto")
+        for location in Location:
+            crawl.add_map(location)
+        crawl.run(processes=8)
+
+    The queue and sink outlive the crawl, so if it gets stopped (or a worker dies), running it again picks up where it left off - tasks whose worker never finished them are handed out again once their lease runs out.
+
+    Note: Each worker process runs its own event loop and connections (with the connection limits in Options), so the site gets up to processes*max_connections requests at once. Be gentle with it.
+
+    :queue: The WorkQueue to keep the frontier in, e.g. a SqliteQueue.
+
+    :sink: The Sink to write the profiles to, e.g. a SqliteSink.
+
+    :batch_size: How many tasks a worker takes from the queue at once.
+
+    :lease: How long (in seconds) a worker has to finish a batch before it's handed to another one.
+
+    :retries: How many times a page that failed to download is tried again (by any worker) before it's given up on.
+    """
+
+    def __init__(self, queue:WorkQueue, sink:Sink, batch_size:int=50, lease:float=300.0, retries:int=2):
+        self.queue = queue
+        self.sink = sink
+        self.batch_size = batch_size
+        self.lease = lease
+        self.retries = retries
+
+    def add_category(self,category:Category,starting_page:int=1,ending_page:int=0):
+        """
+        Add the pages of a category within a page range to the frontier (see scrape_category).
+
+        :category: Enum from Category class to use.
+
+        :starting_page: The page to start at (>0).
+
+        :ending_page: The last page (inclusive), or 'auto' for the category's last page, found with find_last_page.
+
+        :return: None.
+        """
+        if not isinstance(category,Category):
+            raise Exception("Invalid Category Parameter.")
+        starting_page = max(starting_page,1)
+        if ending_page == "auto":
+            ending_page = bf.run(self._last_page(category))
+        urls = bf.category_urls(category,starting_page,max(starting_page,ending_page))
+        Logs._log("Adding %d page(s) of %s category to the crawl ...",len(urls),category.name)
+        self.queue.put((url,"listing","post_listing") for url in urls)
+
+    async def _last_page(self,category):
+        async with session_scope():
+            return await bf.find_last_page(category,current_session())
+
+    def add_map(self,location:Location):
+        """
+        Add a location on the site's map to the frontier (see scrape_map).
+
+        :location: Enum from Location class to use.
+
+        :return: None.
+        """
+        if not isinstance(location,Location):
+            raise Exception("Invalid Location Parameter")
+        self.queue.put([(bf.map_url(location),"listing","cnwMaps_mainProfileList")])
+
+    def add_top(self,category:Category=None):
+        """
+        Add a top list to the frontier (see scrape_top).
+
+        :category: Enum from Category class to use, or None for the Top 100 list.
+
+        :return: None.
+        """
+        self.queue.put([(bf.top_url(category),"listing","top_100_list")])
+
+    def add_names(self,names):
+        """
+        Add searches for names to the frontier (see scrape_names). The profile of the best match of each one gets crawled.
+
+        :names: An iterable of names.
+
+        :return: None.
+        """
+        self.queue.put((bf.search_url(name),"search",name) for name in names)
+
+    def add_urls(self,urls):
+        """
+        Add profile page URLs to the frontier, e.g. from iter_sitemap.
+
+        :urls: An iterable of profile page URLs.
+
+        :return: None.
+        """
+        self.queue.put((bf.canonical_url(url),"profile","") for url in urls)
+
+    def progress(self,shards=None):
+        """
+        See how far along the crawl is.
+
+        :shards: Only count the tasks of these shards. Default (None) means all of them.
+
+        :return: A dict of state ('pending', 'leased', 'done' or 'failed') -> number of tasks.
+        """
+        return self.queue.counts(shards)
+
+    def run(self,processes:int=0,shards=None):
+        """
+        Crawl until the frontier is empty, with worker processes on this machine. To crawl with several machines (with a queue and sink they can all reach), run this on each of them - give each one different shards to keep them apart, or let them all share every shard. Workers on a few shards keep going while any task in the queue is leased (it can lead to more tasks in their shards), but the pages of other shards that nobody has worked on yet can still do so after they stop - so when splitting by shards, run once more over every shard after all the machines are done, to pick up whatever is left.
+
+        Each worker process starts with this process's Options, Logs (console, verbose and log file) and Metrics.enabled settings. Metrics hooks aren't passed on, and the measurements a worker takes stay in that worker.
+
+        :processes: How many worker processes to start. Default (0) means as many as there are CPU cores. Use 1 to work in this process instead.
+
+        :shards: Only work on the tasks of these shards (an iterable of shard numbers). Default (None) means every shard.
+
+        :return: A dict of state -> number of tasks when the crawl stopped (see progress). The failed URLs can be had from the queue's failed_urls.
+        """
+        processes = processes or os.cpu_count() or 1
+        shards = list(shards) if shards is not None else None
+        Logs._log("Starting crawl with %d worker(s) ...",processes)
+        if processes == 1:
+            self.work(shards)
+        else:
+            settings = _settings()
+            workers = [multiprocessing.Process(target=_run_worker,args=(self,settings,shards,f"{socket.gethostname()}-{os.getpid()}-{i}")) for i in range(processes)]
+            for worker in workers:
+                worker.start()
+            try:
+                for worker in workers:
+                    worker.join()
+            except KeyboardInterrupt:
+                for worker in workers:
+                    worker.terminate()
+                raise
+        counts = self.progress(shards)
+        Logs._log("Crawl finished: %d done, %d failed, %d left ...",counts["done"],counts["failed"],counts["pending"]+counts["leased"])
+        if shards is not None:
+            left = self.progress()["pending"]
+            if left:
+                Logs._log("%d task(s) still pending in the queue - run again over every shard once all workers are done, to finish the crawl ...",left)
+        return counts
+
+    def work(self,shards=None,worker:str=""):
+        """
+        Work on the crawl in this process until the frontier is empty - for running workers some other way than run (e.g. a job scheduler starting one per node).
+
+        :shards: Only work on the tasks of these shards. Default (None) means every shard.
+
+        :worker: Name of the worker in the queue. Default is made from the host name and process id.
+
+        :return: None.
+        """
+        bf.run(self._work(shards,worker or f"{socket.gethostname()}-{os.getpid()}"))
+
+    async def _work(self,shards,worker):
+        # Take batches from the queue until there's nothing left - while any task in the whole queue is leased (not just in these shards), wait for it, since it can add more tasks to these shards (or its worker can die and leave it behind)
+        async with session_scope():
+            while True:
+                tasks = self.queue.take(worker,self.batch_size,shards,self.lease)
+                if tasks:
+                    await self._do(tasks)
+                    continue
+                if not self.queue.counts()["leased"]:
+                    return
+                await asyncio.sleep(1)
+
+    async def _do(self,tasks):
+        # Download a batch of tasks and handle each page by its kind. Everything a page leads to is stored before the page is marked as done, so a worker dying halfway only means some pages get done again. A page that can't be parsed (e.g. a profile URL that isn't a profile page) is failed on its own, without holding up the rest of the batch.
+        pages = await bf.get_pages_async([url for url,kind,data in tasks])
+        failed = [page["url"] for page in pages if page["error"]]
+        if failed:
+            self.queue.fail(failed,self.retries,"Couldn't download page")
+        found,profiles,done = [],[],[]
+        for (url,kind,data),page in zip(tasks,pages):
+            if page["error"]: continue
+            try:
+                if not bf.is_valid(page):
+                    pass
+                elif kind == "listing":
+                    links = await bf.parse_async(bf.links_parser(data),page["html"])
+                    if isinstance(links,Exception): raise links
+                    found += [(bf.canonical_url(link),"profile","") for link in links]
+                elif kind == "search":
+                    link = bf.match_search_result(page["html"],data)
+                    if link: found.append((bf.canonical_url(link),"profile",""))
+                else:
+                    profile = await bf.parse_async(bf.profile_parser(),page["html"])
+                    if isinstance(profile,Exception): raise profile
+                    profile.url = page["url"]
+                    profiles.append(profile)
+            except Exception as err:
+                Logs._log("FAILED: Couldn't parse page (%r) - %s",err,url,url=url,error=repr(err))
+                self.queue.fail([url],self.retries,repr(err))
+                failed.append(url)
+                continue
+            done.append(url)
+        if found:
+            self.queue.put(found)
+        if profiles:
+            self.sink.write(profiles)
+        self.queue.done(done)
+        Logs._log("Crawled %d page(s): %d profile(s), %d new link(s), %d failed ...",len(pages),len(profiles),len(found),len(failed),is_verbose=True)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from cnw_scraper.logs import Logs
+
+class Journal:
+    """
+    An on-disk record of a crawl's progress, so a long scrape_category or scrape_names run can pick up where it left off if it gets interrupted (crash, Ctrl+C, killed server, etc.). Every finished listing page, search and profile is appended to the file as a line of JSON, along with what was parsed out of it. Run the same call again with a Journal on the same file and everything already in it is reused instead of being downloaded and parsed again.
+
+    Use it as a context manager (or call close when done) so the last records are saved. E.g. -
+
+        with Journal("./actors.journal") as journal:
+            profiles = scrape_category(Category.ACTORS, 1, 300, journal=journal)
+
+    Note: Records are written to the file right away, but only forced onto the disk (fsync) every sync_every records or sync_interval seconds, since doing that for every record would be slow. Killing the process won't lose anything - a power cut can lose the last few records, which simply get done again. Pages that failed to download or couldn't be parsed aren't recorded. Delete the file to start over.
+
+    :path: Path of the journal file (created if it isn't there).
+
+    :sync_every: How many records can be written before they get forced onto the disk.
+
+    :sync_interval: How long (in seconds) records can be written before they get forced onto the disk.
+    """
+
+    def __init__(self, path:str, sync_every:int=100, sync_interval:float=5.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._records = {}
+        self._unsynced = 0
+        self._last_sync = time.time()
+        self._load()
+        self._file = open(path,"a",encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _load(self):
+        # Read the records of an earlier run, if there was one
+        if not os.path.exists(self.path):
+            return
+        with open(self.path,encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short when the last run was stopped
+                    continue
+                self._records[(record["kind"],record["url"])] = record["data"]
+        Logs._log("Loaded %d record(s) from journal ...",len(self._records))
+
+    def has(self,kind,url):
+        # Whether a page of a kind ('listing', 'search' or 'profile') is done
+        return (kind,url) in self._records
+
+    def get(self,kind,url):
+        # What was recorded for a finished page
+        return self._records[(kind,url)]
+
+    def record(self,kind,url,data):
+        # Mark a page as done, along with what was parsed out of it (anything JSON can hold)
+        self._records[(kind,url)] = data
+        self._file.write(json.dumps({"kind":kind,"url":url,"data":data})+"\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every or time.time() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """
+        Force the records written so far onto the disk. This happens on its own every so often, and on close.
+
+        :return: None.
+        """
+        if self._file.closed or not self._unsynced: return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def close(self):
+        """
+        Save the remaining records and close the file. The journal can't be used afterwards.
+
+        :return: None.
+        """
+        if self._file.closed: return
+        self.sync()
+        self._file.close()
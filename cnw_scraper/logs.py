@@ -1,44 +1,123 @@
+import atexit
+import json
 import logging
-import inspect
 import os
+import queue
+import sys
+
+# The package's own logger - everything is logged through it, never through the root logger
+_logger = logging.getLogger("cnw_scraper")
+_logger.addHandler(logging.NullHandler())
+# Fields that can be attached to a log entry, besides its message
+_FIELDS = ("url","status","duration","error")
+
+class _JsonFormatter(logging.Formatter):
+    # One JSON object per entry, with its fields
+    def format(self,record):
+        entry = {"time":self.formatTime(record,"%Y-%m-%d %X"),"level":record.levelname,"message":record.getMessage()}
+        entry.update({field:getattr(record,field) for field in _FIELDS if hasattr(record,field)})
+        return json.dumps(entry)
 
 class Logs:
     """
     Handles logging of what this program is doing. It will write logs to either a file or console, or both. Use write_to_file function to write logs to a file at a specified path. The log file, if present, gets overwritten each run, so if you want to save a log file, simply rename the actual file to something else.
-    
+
+    Everything is logged through the standard 'cnw_scraper' logger (never the root logger), so it can also be set up like any other logger with the logging module - regular updates are logged at INFO level and the extra verbose ones at DEBUG. Entries about a page carry its url, status, duration (seconds) and/or error as fields on the log record, e.g. for '%(url)s' in your own format or a JSON log. The console and file are written to from a background thread, so scraping never waits on them.
+
     Note: All of the following boolean values are False by default.
-    
-    :print_to_console: Use print function to print logs to console?
-    
+
+    :print_to_console: Print logs to the console (stdout)?
+
     :verbose: Some parts of the program use extensive logging for every detail. Enable the extra logging?
     """
     print_to_console = False
     verbose = False
-    _logger = None
+    _console = None
+    _file = None
+    _queue = None
+    _listener = None
 
     @classmethod
-    def write_to_file(cls,file_path:str="",include_datetime:bool=True):
+    def write_to_file(cls,file_path:str="",include_datetime:bool=True,as_json:bool=False):
         """
-        Initialize logging to a .log file using an established directory. Subsequent calls do nothing, only the first call does anything. If the file_path argument is left out, the default arg is used. The default path is the directory level that calls this function and the name is collected from __main__ with modifications. E.g. - 'my_script.py' -> 'my_script-cnw.log'
-        
-        Note: File is created if it isn't there, and if it is, it will be overwritten. Also, actual file writing only occurs upon program exit.
-        
-        :file_path: Provide an optional valid directory path (relative to where this function was called from or absolute) and name for the file (name will end with a '.log' extension). E.g. - './my_project/logs/my_cnw_logs' -> 'my_cnw_logs.log' file in logs directory.
-        
+        Initialize logging to a .log file using an established directory. Subsequent calls do nothing, only the first call does anything. If the file_path argument is left out, the default arg is used. The default path is the directory of the script being run and the name is the script's name with modifications. E.g. - 'my_script.py' -> 'my_script-cnw.log'
+
+        Note: File is created if it isn't there, and if it is, it will be overwritten.
+
+        :file_path: Provide an optional valid directory path (relative to the working directory or absolute) and name for the file (name will end with a '.log' extension). E.g. - './my_project/logs/my_cnw_logs' -> 'my_cnw_logs.log' file in logs directory.
+
         :include_datetime: Bool for whether or not to include a formatted date/time marker for each log entry that gets written out to the file.
-        
+
+        :as_json: Write each entry as a line of JSON instead (with its time, level, message and fields), for log tools to read.
+
         :return: None
         """
-        if cls._logger: return
-        path = os.path.split([i.filename for i in inspect.stack()][-1])
-        log_file = file_path if file_path else "".join([path[0],"/",path[1].replace(".py",""),"-cnw"])
-        frmt = "%(asctime)s - LOG: %(message)s" if include_datetime else "LOG: %(message)s"
-        logging.basicConfig(filename=log_file+".log",filemode="w",format=frmt,datefmt="%Y-%m-%d %X",level="INFO")
-        cls._logger = logging.getLogger()
+        if cls._file: return
+        script = os.path.splitext(os.path.abspath(sys.argv[0]))[0] if sys.argv and sys.argv[0] else os.path.abspath("cnw")
+        log_file = file_path if file_path else script+"-cnw"
+        # Start the file over, then append to it - so worker processes of a crawl (see Crawl.run) can write to the same file without overwriting each other
+        open(log_file+".log","w").close()
+        handler = logging.FileHandler(log_file+".log",mode="a",encoding="utf-8")
+        if as_json:
+            handler.setFormatter(_JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s - LOG: %(message)s" if include_datetime else "LOG: %(message)s","%Y-%m-%d %X"))
+        cls._file = handler
+        cls._restart()
 
     @classmethod
-    def _log(cls,txt,is_verbose=False):
-        # Used for printing/writing status updates and logging for the application
-        if not cls.verbose and is_verbose: return
-        if cls._logger: cls._logger.info(txt)
-        if cls.print_to_console: print("CNW - "+txt)
\ No newline at end of file
+    def _restart(cls):
+        # Hand the console/file handlers to a fresh background listener, and send the logger's entries to it through a queue
+        if cls._listener:
+            cls._listener.stop()
+            cls._listener = None
+        handlers = [handler for handler in [cls._console,cls._file] if handler]
+        if not handlers:
+            return
+        # Imported here since logging.handlers pulls in a lot (sockets, pickle, ...) that a program which never logs doesn't need
+        from logging.handlers import QueueHandler,QueueListener
+        if not cls._queue:
+            cls._queue = queue.SimpleQueue()
+            handler = QueueHandler(cls._queue)
+            # Put entries on the queue as they are - they get formatted on the listener's thread, not the caller's
+            handler.prepare = lambda record: record
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.DEBUG)
+        cls._listener = QueueListener(cls._queue,*handlers)
+        cls._listener.start()
+
+    @classmethod
+    def _update_console(cls):
+        # Add or remove the console handler to match print_to_console
+        if cls.print_to_console:
+            cls._console = logging.StreamHandler(sys.stdout)
+            cls._console.setFormatter(logging.Formatter("CNW - %(message)s"))
+        else:
+            cls._console = None
+        cls._restart()
+
+    @classmethod
+    def _log(cls,msg,*args,is_verbose=False,**fields):
+        # Used for printing/writing status updates and logging for the application. The message is only formatted (msg % args) if the entry actually gets written somewhere, so pass the values as args instead of building the string first. Keyword arguments are attached as fields (see _FIELDS).
+        if is_verbose and not cls.verbose: return
+        if cls.print_to_console != (cls._console is not None):
+            cls._update_console()
+        level = logging.DEBUG if is_verbose else logging.INFO
+        if _logger.isEnabledFor(level):
+            _logger.log(level,msg,*args,extra=fields or None)
+
+@atexit.register
+def _stop_listener():
+    # Write out whatever is still queued before the program exits
+    if Logs._listener:
+        Logs._listener.stop()
+        Logs._listener = None
+
+def _after_fork():
+    # A forked process (e.g. a parse worker) doesn't get the listener's thread, so start its own
+    if Logs._listener:
+        Logs._listener = None
+        Logs._restart()
+
+if hasattr(os,"register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,165 @@
+import bisect
+import json
+import time
+from functools import partial
+
+# Upper bounds (in seconds) of the latency histogram buckets
+_BUCKETS = (0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0,30.0,60.0)
+# What each metric measures
+_HELP = {
+    "cnw_stage_seconds":"Time spent in each stage of a scrape (get_pages, parse, parse_profile, sort).",
+    "cnw_fetch_seconds":"Time to get a page, including retries and waits between them.",
+    "cnw_dns_seconds":"Time spent resolving host names.",
+    "cnw_connect_seconds":"Time spent opening new connections (including TLS).",
+    "cnw_wait_seconds":"Time from sending a request to getting the response headers back.",
+    "cnw_download_seconds":"Time spent downloading response bodies.",
+    "cnw_pages_total":"Pages requested by stage.",
+    "cnw_responses_total":"Responses by HTTP status ('error' for connection errors/timeouts).",
+    "cnw_retries_total":"Requests that were tried again.",
+    "cnw_failed_pages_total":"Pages that couldn't be downloaded even after retrying.",
+    "cnw_cache_hits_total":"Pages read from the cache after the site said they didn't change.",
+    "cnw_bytes_received_total":"Response body bytes received from the site.",
+    "cnw_profiles_parsed_total":"Profile pages parsed.",
+}
+
+class Metrics:
+    """
+    Counters and latency histograms for every stage of a scrape, to find out where the time actually goes - DNS/connecting, waiting on the site, downloading, parsing or sorting - along with status codes, retries, cache hits and bytes received. Off by default, in which case it costs next to nothing (every measurement is skipped by a single check).
+
+    Turn it on before scraping, then export the results as Prometheus text or JSON. E.g. -
+
+        Metrics.enabled = True
+        profiles = scrape_category(Category.ACTORS, 1, 20)
+        print(Metrics.to_prometheus())
+
+    Note: DNS/connect timings only get measured on connections opened while metrics are on (e.g. turn it on before opening a Client). With parse_executor='process', the per-page parse_profile timings are taken in the worker processes and don't show up here - the 'parse' stage still covers parsing as a whole.
+
+    :enabled: Measure anything at all? False by default.
+    """
+    enabled = False
+    _counters = {}
+    _histograms = {}
+    _hooks = []
+
+    @classmethod
+    def add_hook(cls,hook):
+        """
+        Have a function called with every measurement as it's made, e.g. to feed them to your own monitoring or profiler. It's called as hook(kind, name, value, labels), where kind is 'counter' or 'histogram' and labels is a dict. Keep it quick, as it runs in the middle of scraping.
+
+        :hook: The function to call.
+
+        :return: None.
+        """
+        cls._hooks.append(hook)
+
+    @classmethod
+    def remove_hook(cls,hook):
+        """
+        Stop calling a function added with add_hook.
+
+        :hook: The function to stop calling.
+
+        :return: None.
+        """
+        if hook in cls._hooks: cls._hooks.remove(hook)
+
+    @classmethod
+    def reset(cls):
+        """
+        Throw out every measurement made so far (hooks stay).
+
+        :return: None.
+        """
+        cls._counters.clear()
+        cls._histograms.clear()
+
+    @classmethod
+    def _count(cls,name,value=1,**labels):
+        # Add to a counter
+        key = (name,tuple(sorted((k,str(v)) for k,v in labels.items())))
+        cls._counters[key] = cls._counters.get(key,0)+value
+        for hook in cls._hooks: hook("counter",name,value,labels)
+
+    @classmethod
+    def _observe(cls,name,seconds,**labels):
+        # Add a timing to a histogram - bucket counts (not cumulative), then the sum and count
+        key = (name,tuple(sorted((k,str(v)) for k,v in labels.items())))
+        histogram = cls._histograms.get(key)
+        if histogram is None:
+            histogram = cls._histograms[key] = [0]*(len(_BUCKETS)+3)
+        histogram[bisect.bisect_left(_BUCKETS,seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+        for hook in cls._hooks: hook("histogram",name,seconds,labels)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Get every measurement made so far as plain data.
+
+        :return: A dict with a 'counters' list ({name, labels, value}) and a 'histograms' list ({name, labels, buckets, sum, count}, where buckets maps each upper bound in seconds to the cumulative count of timings up to it, like Prometheus).
+        """
+        counters = [{"name":name,"labels":dict(labels),"value":value} for (name,labels),value in sorted(cls._counters.items())]
+        histograms = []
+        for (name,labels),histogram in sorted(cls._histograms.items()):
+            running,buckets = 0,{}
+            for bound,count in zip(list(_BUCKETS)+["+Inf"],histogram[:-2]):
+                running += count
+                buckets[str(bound)] = running
+            histograms.append({"name":name,"labels":dict(labels),"buckets":buckets,"sum":histogram[-2],"count":histogram[-1]})
+        return {"counters":counters,"histograms":histograms}
+
+    @classmethod
+    def to_json(cls):
+        """
+        Get every measurement made so far as JSON (see snapshot for the layout).
+
+        :return: A JSON string.
+        """
+        return json.dumps(cls.snapshot())
+
+    @classmethod
+    def to_prometheus(cls):
+        """
+        Get every measurement made so far in the Prometheus text exposition format, e.g. to serve from a /metrics endpoint.
+
+        :return: A string of Prometheus metrics.
+        """
+        snapshot = cls.snapshot()
+        label_text = lambda labels: "{"+",".join(f'{k}="{v}"' for k,v in labels.items())+"}" if labels else ""
+        lines,described = [],set()
+        def describe(name,kind):
+            # The HELP/TYPE lines go once before a metric's first line
+            if name not in described:
+                described.add(name)
+                lines.extend([f"# HELP {name} {_HELP.get(name,name)}",f"# TYPE {name} {kind}"])
+        for counter in snapshot["counters"]:
+            describe(counter["name"],"counter")
+            lines.append(f"{counter['name']}{label_text(counter['labels'])} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name,labels = histogram["name"],histogram["labels"]
+            describe(name,"histogram")
+            for bound,count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{label_text({**labels,'le':bound})} {count}")
+            lines.append(f"{name}_sum{label_text(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{label_text(labels)} {histogram['count']}")
+        return "\n".join(lines)+"\n"
+
+    @classmethod
+    def _trace_config(cls):
+        # An aiohttp TraceConfig that times DNS lookups and new connections, and counts the bytes received
+        from aiohttp import TraceConfig
+        trace = TraceConfig()
+        async def start(session,ctx,params,stage=""):
+            setattr(ctx,stage,time.perf_counter())
+        async def end(session,ctx,params,stage=""):
+            if cls.enabled and hasattr(ctx,stage):
+                cls._observe(f"cnw_{stage}_seconds",time.perf_counter()-getattr(ctx,stage))
+        async def chunk(session,ctx,params):
+            if cls.enabled: cls._count("cnw_bytes_received_total",len(params.chunk))
+        trace.on_dns_resolvehost_start.append(partial(start,stage="dns"))
+        trace.on_dns_resolvehost_end.append(partial(end,stage="dns"))
+        trace.on_connection_create_start.append(partial(start,stage="connect"))
+        trace.on_connection_create_end.append(partial(end,stage="connect"))
+        trace.on_response_chunk_received.append(chunk)
+        return trace
@@ -0,0 +1,120 @@
+import json
+from difflib import get_close_matches
+from urllib.parse import urlsplit
+from cnw_scraper.base_functions import clean_name
+from cnw_scraper.sitemap import is_profile_url
+
+def normalize_name(name):
+    # The form of a name used as a key: lowercase, only letters/numbers/apostrophes, single spaces (hyphens count as spaces)
+    return " ".join(clean_name(name).lower().replace("-"," ").split())
+
+def url_name(url):
+    # The name in a profile URL - '.../elon-musk-net-worth/' -> 'elon musk'
+    slug = urlsplit(url).path.rstrip("/").rsplit("/",1)[-1]
+    return normalize_name(slug[:-len("-net-worth")] if slug.endswith("-net-worth") else slug)
+
+class NameIndex:
+    """
+    A local index of names and the profile URLs they belong to, so scrape_names can find most names without searching the site at all. Fill it with profiles you've already scraped, or with every profile URL in the site's sitemaps (the name is taken from the URL), then pass it to scrape_names. Names that are found through the site's search get added to it as well. E.g. -
+
+        index = NameIndex()
+        index.add_urls(url for url,lastmod in iter_sitemap())
+        index.save("./names.json")
+        profiles = scrape_names(["Elon Musk", "Oprah Winfrey"], index=index)
+
+    Names are matched ignoring case, punctuation and extra spaces. Names that aren't in the index word for word are matched to the closest one, as long as they're similar enough (see cutoff) - so small typos and spelling differences still resolve.
+
+    :cutoff: How similar (0 to 1) a name has to be to an indexed one to count as a match, when it isn't in the index word for word. 0.9 by default - 1 turns fuzzy matching off.
+    """
+
+    def __init__(self, cutoff:float=0.9):
+        self.cutoff = cutoff
+        self._urls = {}
+        self._words = {}
+
+    def __len__(self):
+        return len(self._urls)
+
+    def add(self,name:str,url:str):
+        """
+        Add a name and the URL of its profile (replacing the URL if the name is already in the index).
+
+        :name: The subject's name.
+
+        :url: URL of the subject's profile.
+
+        :return: None.
+        """
+        key = normalize_name(name)
+        if not key: return
+        self._urls[key] = url
+        for word in key.split():
+            self._words.setdefault(word,set()).add(key)
+
+    def add_profiles(self,profiles):
+        """
+        Add the names and URLs of profiles, e.g. the result of an earlier scrape.
+
+        :profiles: An iterable of Profile objects.
+
+        :return: None.
+        """
+        for profile in profiles:
+            if profile.url: self.add(profile.name,profile.url)
+
+    def add_urls(self,urls):
+        """
+        Add profile URLs, with the names taken from the URLs themselves - e.g. from iter_sitemap. URLs that aren't profiles are skipped.
+
+        :urls: An iterable of profile URLs.
+
+        :return: None.
+        """
+        for url in urls:
+            if is_profile_url(url): self.add(url_name(url),url)
+
+    def lookup(self,name:str):
+        """
+        Find the profile URL of a name.
+
+        :name: The name to look for.
+
+        :return: The URL of the matching profile, or None if there isn't one.
+        """
+        key = normalize_name(name)
+        if key in self._urls:
+            return self._urls[key]
+        if self.cutoff >= 1:
+            return None
+        # Only compare against names that share a word with this one, instead of the whole index
+        candidates = set().union(*[self._words.get(word,()) for word in key.split()])
+        close = get_close_matches(key,candidates,n=1,cutoff=self.cutoff)
+        return self._urls[close[0]] if close else None
+
+    def save(self,file_path:str):
+        """
+        Save the index to a JSON file, to be loaded back with NameIndex.load.
+
+        :file_path: Path of the file to write (overwritten if it's there).
+
+        :return: None.
+        """
+        with open(file_path,"w",encoding="utf-8") as f:
+            json.dump(self._urls,f)
+
+    @classmethod
+    def load(cls,file_path:str,cutoff:float=0.9):
+        """
+        Load an index saved with save.
+
+        :file_path: Path of the saved file.
+
+        :cutoff: See NameIndex.
+
+        :return: A NameIndex object.
+        """
+        index = cls(cutoff)
+        with open(file_path,encoding="utf-8") as f:
+            for key,url in json.load(f).items():
+                index.add(key,url)
+        return index
@@ -1,18 +1,54 @@
-from aiohttp import ClientTimeout
-
 class Options: 
     """
     Change certain options here.
 
     :custom_user_agent: Send a different user-agent string to the site when connecting, instead of the default one.
     
-    :include_description: True by default. Change to false if you don't want your collected profiles to include the description portion (which can be lengthy and arguably needless for data processing).
+    :include_description: True by default. Change to false if you don't want your collected profiles to include the description portion (which can be lengthy and arguably needless for data processing). Either way, the description is skipped while parsing the stats - with this on, it's kept as compressed HTML and only turned into text when a profile's description is first read.
+
+    :max_connections: The most requests that can be in-flight at the same time (20 by default). URLs are handed out from a queue to this many workers, so large batches are downloaded at a steady rate instead of all at once.
+
+    :max_connections_per_host: The most requests that can be in-flight at the same time to any one host (10 by default). Lower this if the site starts rate limiting you.
+
+    :retries: How many more times to try a page that failed to download (3 by default) - because of a connection error/timeout, or because the site was struggling (HTTP 429/500/502/503/504). Tries are spaced out with a randomized, exponentially growing wait, or for as long as the site asks (with a Retry-After header). Pages that still fail are skipped and listed in the failed_urls of the returned list, instead of crashing the whole scrape.
+
+    :retry_backoff: The base wait (in seconds) between tries - the wait before try N is a random amount up to retry_backoff * 2^N. 1 second by default.
+
+    :circuit_breaker_threshold: After this many failed requests in a row to a host (10 by default), stop sending it requests for a while - they wait until the cooldown is over instead, and each wait counts as one of the page's tries. 0 turns this off.
+
+    :circuit_breaker_cooldown: How long (in seconds) to stop sending requests to a failing host before trying it again. 30 seconds by default.
+
+    :page_count_ttl: How long (in seconds) the number of pages found in a category (with ending_page='auto' or find_last_page) is remembered before it gets looked up again. An hour by default.
+
+    :search_memo_size: How many name searches (scrape_names) are remembered, found or not, so the same name isn't searched for on the site twice (10000 by default). The least recently used ones are forgotten first. 0 turns this off.
+
+    :search_memo_ttl: How long (in seconds) a name search is remembered before it gets searched for again. An hour by default.
+
+    :parse_workers: How many workers to parse pages with (0 by default, which means pages are parsed one at a time on the main thread). Parsing is CPU heavy, so for big scrapes (e.g. a whole category) set this to the number of CPU cores you have so parsing can keep up with downloading. Parsed profiles always come back in the same order either way.
+
+    :parse_executor: The kind of workers used when parse_workers is above 0 - 'process' (default) for a pool of processes that can use every core, or 'thread' for a pool of threads, which is lighter to start but is limited by the GIL.
+
+    :parser: The engine used to parse the site's pages - 'html.parser' (default, always available but the slowest), 'lxml' (BeautifulSoup with the lxml parser, needs the lxml package) or 'selectolax' (the fastest, skips BeautifulSoup entirely, needs the selectolax package). If the chosen parser isn't installed, the next fastest one that is gets used instead. All of them give the same results.
     """
     custom_user_agent = ""
     include_description = True
+    max_connections = 20
+    max_connections_per_host = 10
+    retries = 3
+    retry_backoff = 1.0
+    circuit_breaker_threshold = 10
+    circuit_breaker_cooldown = 30.0
+    page_count_ttl = 3600
+    search_memo_size = 10000
+    search_memo_ttl = 3600
+    parse_workers = 0
+    parse_executor = "process"
+    parser = "html.parser"
     _DEFAULT_UA = "Totally Not A Bot"
-    _PARSER = "html.parser"
-    _TIMEOUT = ClientTimeout(total=300)
+    _SITE_URL = "https://www.celebritynetworth.com"
+    _TIMEOUT = None
+    _TIMEOUT_ARGS = {"total":300}
+    _CACHE = None
 
     @classmethod
     def set_http_timeout(cls,total:float=300,connect:float=None,socket_read:float=None,socket_connect:float=None):
@@ -29,8 +65,37 @@ class Options:
 
         :return: None.
         """
-        cls._TIMEOUT = ClientTimeout(
-        total=total,
-        connect=connect,
-        sock_read=socket_read,
-        sock_connect=socket_connect)
\ No newline at end of file
+        cls._TIMEOUT_ARGS = {
+        "total":total,
+        "connect":connect,
+        "sock_read":socket_read,
+        "sock_connect":socket_connect}
+        cls._TIMEOUT = None
+
+    @classmethod
+    def _timeout(cls):
+        # The ClientTimeout for requests, made on first use so aiohttp isn't imported just to set options
+        if cls._TIMEOUT is None:
+            from aiohttp import ClientTimeout
+            cls._TIMEOUT = ClientTimeout(**cls._TIMEOUT_ARGS)
+        return cls._TIMEOUT
+
+    @classmethod
+    def set_cache(cls,file_path:str="",ttl:float=604800,max_size:int=536870912):
+        """
+        Keep the downloaded pages in an on-disk cache (a SQLite database with compressed pages), so that later scrapes only download the pages that changed. Cached pages are re-checked with the site every time (with the ETag/Last-Modified headers it sent), and if the site says a page didn't change, it gets read from disk instead of downloaded again. By default there's no cache. Calling this again replaces the current cache (the old file is left as is).
+
+        :file_path: Path of the database file to use (created if it isn't there). E.g. - './cache/cnw.sqlite' - an empty string turns the cache off.
+
+        :ttl: How long (in seconds) a page can go without being refreshed before it's thrown out of the cache. A week by default.
+
+        :max_size: How big (in bytes) the cached pages can get in total before the least recently used ones are thrown out. 512 MiB by default.
+
+        :return: None.
+        """
+        if cls._CACHE:
+            cls._CACHE.close()
+            cls._CACHE = None
+        if file_path:
+            from cnw_scraper.cache import ResponseCache
+            cls._CACHE = ResponseCache(file_path,ttl,max_size)
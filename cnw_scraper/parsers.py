@@ -0,0 +1,193 @@
+# ---------- Parser backends that pull the data out of the site's pages
+#
+# Every backend has the same four functions, which return plain data (not Profile objects) so they can be compared with each other:
+#   profile_stats(page_html) -> stats dict
+#   description_text(html) -> description string of the description element in the HTML ('' if there isn't one)
+#   profile_links(page_html,target_id) -> list of profile URLs
+#   search_lead(page_html) -> (text, URL) of the lead search result, or None
+#
+# The description is cut out of a profile page as a plain string (see split_description) before the page is parsed, so the stats can be parsed without building the description's subtree - by far the biggest part of the page - and the description itself can be parsed later, only if it's needed.
+
+import re
+from importlib.util import find_spec
+from cnw_scraper.logs import Logs
+
+# Parsers in order of speed, with the module each one needs
+PARSERS = {
+    "selectolax":"selectolax",
+    "lxml":"lxml",
+    "html.parser":None,
+}
+_SEARCH_LEAD = "post_item anchored  search_result lead"
+_JUNK_TAGS = ["div","img","table","style"]
+# Tags that can't hold anything - e.g. a <meta itemprop="description"> (schema.org markup) isn't the description
+_VOID_TAGS = ["area","base","br","col","embed","hr","img","input","link","meta","param","source","track","wbr"]
+_MAIN = re.compile(r"""<\w+\b[^>]*\bid=["']single__main["']""")
+_DESCRIPTION = re.compile(rf"""<(?!(?:{'|'.join(_VOID_TAGS)})\b)(\w+)\b[^>]*\bitemprop=["']description["']""")
+_resolved = {}
+
+def available_parsers():
+    # Names of the parsers that can be used in this environment, fastest first
+    return [name for name,module in PARSERS.items() if module is None or find_spec(module)]
+
+def resolve(name):
+    # Get the parser to actually use for a name, falling back to the next fastest one if it isn't installed
+    if name in _resolved:
+        return _resolved[name]
+    if name not in PARSERS:
+        raise Exception(f"Invalid parser '{name}' - use one of: {', '.join(PARSERS)}.")
+    names = list(PARSERS)
+    usable = available_parsers()
+    resolved = next(n for n in names[names.index(name):] if n in usable)
+    if resolved != name:
+        Logs._log("Parser '%s' isn't installed, falling back to '%s' ...",name,resolved)
+    _resolved[name] = resolved
+    return resolved
+
+def split_description(page_html):
+    # Cut the description element (the first one in the page's main section) out of a profile page by matching up its opening and closing tags, without parsing anything. Returns (page without the description, description HTML) - the description HTML is '' if the page has none, or None if its end couldn't be found (then the page is returned as is).
+    main = _MAIN.search(page_html)
+    start = _DESCRIPTION.search(page_html,main.start()) if main else None
+    if not start:
+        return page_html,""
+    depth = 0
+    for tag in re.finditer(rf"<(/?){start.group(1)}\b[^>]*>",page_html[start.start():]):
+        if tag.group(0).endswith("/>"): continue
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            end = start.start()+tag.end()
+            return page_html[:start.start()]+page_html[end:],page_html[start.start():end]
+    return page_html,None
+
+def profile_stats(page_html,parser):
+    if resolve(parser) == "selectolax":
+        return _lax_profile_stats(page_html)
+    return _soup_profile_stats(page_html,resolve(parser))
+
+def description_text(html,parser):
+    if resolve(parser) == "selectolax":
+        return _lax_description_text(html)
+    return _soup_description_text(html,resolve(parser))
+
+def profile_links(page_html,target_id,parser):
+    if resolve(parser) == "selectolax":
+        return _lax_profile_links(page_html,target_id)
+    return _soup_profile_links(page_html,target_id,resolve(parser))
+
+def search_lead(page_html,parser):
+    if resolve(parser) == "selectolax":
+        return _lax_search_lead(page_html)
+    return _soup_search_lead(page_html,resolve(parser))
+
+# ---------- BeautifulSoup (html.parser/lxml)
+
+def _soup_profile_stats(page_html,features):
+    from bs4 import BeautifulSoup,SoupStrainer
+    soup = BeautifulSoup(page_html,features=features,parse_only=SoupStrainer(attrs={"id":"single__main"}))
+    soup_name = soup.find(attrs={"itemprop":"name"})["content"]
+    soup_stats = soup.find("table",attrs={"class":"celeb_stats_table"})
+    # Get name first...
+    data = {"Name":soup_name}
+    # Then get the stats from the table, if there.
+    if soup_stats:
+        for table in soup_stats:
+            data.update({table.td.text[:-1]:table.td.next_sibling.text})
+    # If Net Worth exists, change to the numerical representation found on the site, otherwise just give it zero for sanity reasons. Yes, that's right, there are some celebritynetworth.com profiles that don't - *GASP!* - have a net worth listed. Ridiculous, I say!
+    if "Net Worth" in data:
+        data["Net Worth"] = soup.find("meta",attrs={"itemprop":"price"})["content"]
+    else:
+        data["Net Worth"] = "0"
+    return data
+
+def _is_description(tag):
+    # Whether a soup tag is a description element
+    return tag.get("itemprop") == "description" and tag.name not in _VOID_TAGS
+
+def _soup_description_text(html,features):
+    from bs4 import BeautifulSoup,SoupStrainer
+    # A whole page is only searched inside of its main section (a description cut out of its page is searched as is)
+    main = SoupStrainer(attrs={"id":"single__main"}) if _MAIN.search(html) else None
+    soup_desc = BeautifulSoup(html,features=features,parse_only=main).find(_is_description)
+    # Get description if available.
+    desc = []
+    if soup_desc:
+        for tag in soup_desc.children:
+            if tag.name in _JUNK_TAGS:
+                # Junk data
+                continue
+            if tag.name in ["ul","ol"]:
+                # Go through lists and collect info within
+                for li in tag: desc.append(li.text+'\n\n')
+                continue
+            desc.append(tag.text+'\n\n')
+    return "".join(desc)
+
+def _soup_profile_links(page_html,target_id,features):
+    from bs4 import BeautifulSoup,SoupStrainer
+    # Run page through soup and get each listed profile URL inside it
+    profile_list = BeautifulSoup(page_html,features=features,parse_only=SoupStrainer(attrs={"id":target_id}))
+    return [a["href"] for a in profile_list.select("a")]
+
+def _soup_search_lead(page_html,features):
+    from bs4 import BeautifulSoup,SoupStrainer
+    lead = BeautifulSoup(page_html,features=features,parse_only=SoupStrainer(attrs={"class":_SEARCH_LEAD}))
+    if not lead.text:
+        return None
+    return lead.text,lead.find("a")["href"]
+
+# ---------- selectolax (no BeautifulSoup)
+# Walks the same nodes as the soup versions above, straight from selectolax's tree.
+
+def _lax_text(node):
+    # Text of a node and everything inside it, like BeautifulSoup's .text
+    return node.text(deep=True)
+
+def _lax_children(node):
+    # Child elements and text nodes, like iterating over a soup tag (comments are left out)
+    return [child for child in node.iter(include_text=True) if child.tag != "-comment"]
+
+def _lax_profile_stats(page_html):
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    main = HTMLParser(page_html).css_first("#single__main")
+    data = {"Name":main.css_first("[itemprop=\"name\"]").attributes["content"]}
+    stats = main.css_first("table.celeb_stats_table")
+    if stats:
+        # selectolax puts the rows inside of a tbody (like a browser would), so go over the rows themselves
+        for row in stats.css("tr"):
+            td = row.css_first("td")
+            data.update({_lax_text(td)[:-1]:_lax_text(td.next)})
+    if "Net Worth" in data:
+        data["Net Worth"] = main.css_first("meta[itemprop=\"price\"]").attributes["content"]
+    else:
+        data["Net Worth"] = "0"
+    return data
+
+def _lax_description_text(html):
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    desc = []
+    tree = HTMLParser(html)
+    root = tree.css_first("#single__main") or tree
+    soup_desc = next((node for node in root.css("[itemprop=\"description\"]") if node.tag not in _VOID_TAGS),None)
+    if soup_desc:
+        for tag in _lax_children(soup_desc):
+            if tag.tag in _JUNK_TAGS:
+                continue
+            if tag.tag in ["ul","ol"]:
+                for li in _lax_children(tag): desc.append(_lax_text(li)+'\n\n')
+                continue
+            desc.append(_lax_text(tag)+'\n\n')
+    return "".join(desc)
+
+def _lax_profile_links(page_html,target_id):
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    tree = HTMLParser(page_html)
+    return [a.attributes["href"] for node in tree.css(f"[id=\"{target_id}\"]") for a in node.css("a")]
+
+def _lax_search_lead(page_html):
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    leads = HTMLParser(page_html).css(f"[class=\"{_SEARCH_LEAD}\"]")
+    text = "".join(_lax_text(lead) for lead in leads)
+    if not text:
+        return None
+    anchors = [a for lead in leads for a in lead.css("a")]
+    return text,anchors[0].attributes["href"]
@@ -1,3 +1,39 @@
+import re
+import zlib
+from datetime import datetime
+from cnw_scraper import parsers
+
+_HEIGHT = re.compile(r"\(([\d.]+) ?m\)")
+
+def _to_int(value):
+    # Net worth as a whole number of dollars (0 if there isn't one)
+    try:
+        return int(float(value))
+    except (TypeError,ValueError):
+        return 0
+
+def _to_date(value):
+    # A date from the site's 'Jan 12, 1964 (59 years old)', 'Dec 1, 2023' or '2023' style dates, or None if it isn't one
+    if not value:
+        return None
+    value = value.split("(")[0].strip()
+    for fmt in ["%b %d, %Y","%B %d, %Y","%Y"]:
+        try:
+            return datetime.strptime(value,fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _to_height(value):
+    # Height in meters from the site's '5 ft 7 in (1.72 m)' style heights, or None if it isn't one
+    match = _HEIGHT.search(value or "")
+    return float(match.group(1)) if match else None
+
+def _description_text(description_html,parser):
+    # The text of a description from its compressed HTML
+    html = zlib.decompress(description_html).decode("utf-8")
+    return parsers.description_text(html,parser) if html else ""
+
 class Profile:
     """
     An object that contains information from a subject's net worth page (print me for a pretty display of my contents). This object isn't created directly, but rather is made through the scrape functions.
@@ -6,10 +42,25 @@ class Profile:
 
     :stats: Dictionary containing name, net worth, salary, gender, nationality, etc. - Net Worth gets printed out as a dollar amount, but is actually stored as a real number string.
 
-    :description: String containing the bio of the subject - optional.
+    :description: String containing the bio of the subject - optional. Profiles keep the raw HTML of the bio compressed and only turn it into text the first time this is read, so a profile whose description is never looked at costs little to make or keep around.
+
+    :name: The subject's name.
+
+    :net_worth: Net worth in dollars as an integer (0 if the site doesn't list one).
+
+    :birth_date: Date of birth as a datetime.date, or None if not listed.
+
+    :height: Height in meters as a float, or None if not listed.
+
+    :last_updated: When the site last updated the profile as a datetime.date (January 1st when only the year is listed), or None if not listed.
+
+    :url: URL of the profile's page on the site (empty if it isn't known, e.g. from scrape_random).
+
+    :sources: Labels of the sources the profile was found through, when it comes from scrape_sources (empty otherwise).
 
     :fields: Static class attribute. Helper list showing all known stats that make up any profile on the site. Useful for writing these as columns to CSV so you don't have to add them yourself through trial and error. These might change in the future as the site may or may not update the profiles with more stats.
     """
+    __slots__ = ("stats","_description","_description_html","_parser","name","net_worth","birth_date","height","last_updated","url","sources")
 
     fields = [
         "Name",
@@ -23,13 +74,82 @@ class Profile:
         "Last Updated",
     ]
 
-    def __init__(self, stats:dict, description:str):
+    def __init__(self, stats:dict, description:str="", url:str="", description_html:str=None, parser:str="html.parser"):
         self.stats = stats
-        self.description = description
+        # Either the description text, or (while it hasn't been read yet) the compressed HTML it gets parsed from
+        self._description = description if description_html is None else None
+        self._description_html = zlib.compress(description_html.encode("utf-8")) if description_html is not None else None
+        self._parser = parser
+        self.url = url
+        self.sources = []
+        # Typed versions of the stats, parsed once here so sorting and exporting don't have to
+        self.name = stats["Name"]
+        self.net_worth = _to_int(stats.get("Net Worth"))
+        self.birth_date = _to_date(stats.get("Date of Birth"))
+        self.height = _to_height(stats.get("Height"))
+        self.last_updated = _to_date(stats.get("Last Updated"))
+
+    @property
+    def description(self):
+        if self._description is None:
+            self._description = _description_text(self._description_html,self._parser)
+            self._description_html = None
+        return self._description
+
+    @description.setter
+    def description(self,value):
+        self._description = value
+        self._description_html = None
+
+    def to_dict(self,raw_description:bool=False):
+        """
+        Get the profile as a plain dict, e.g. for saving it as JSON.
+
+        :raw_description: If the description hasn't been read yet, keep it as its raw HTML (under 'description_html', along with the 'parser' to read it with) instead of turning it into text now. from_dict makes a profile that still reads it only when needed.
+
+        :return: A dict with the profile's stats, description and URL.
+        """
+        if raw_description and self._description is None:
+            html = zlib.decompress(self._description_html).decode("utf-8")
+            return {"stats":dict(self.stats),"description_html":html,"parser":self._parser,"url":self.url}
+        return {"stats":dict(self.stats),"description":self.description,"url":self.url}
+
+    @classmethod
+    def from_dict(cls,data:dict):
+        """
+        Make a profile back out of a dict from to_dict.
+
+        :data: The dict from to_dict.
+
+        :return: A Profile object.
+        """
+        if "description_html" in data:
+            return cls(dict(data["stats"]),url=data.get("url",""),description_html=data["description_html"],parser=data.get("parser","html.parser"))
+        return cls(dict(data["stats"]),data["description"],data.get("url",""))
 
     def __str__(self):
         stats = dict(self.stats)
-        stats["Net Worth"] = f"${int(stats['Net Worth']):,}"
+        stats["Net Worth"] = f"${self.net_worth:,}"
         x = "".join([f"{key}: {value}\n" for key,value in stats.items()])
         y = self.description[:199]+" ..." if len(self.description) > 200 else self.description
-        return x+"Description: "+y
\ No newline at end of file
+        return x+"Description: "+y
+
+class ProfileList(list):
+    """
+    A list of Profile objects, as returned by the scrape functions. It works exactly like a normal list, but also keeps track of the pages that couldn't be downloaded (even after retrying) or parsed, so a big scrape still returns everything that did work.
+
+    :failed_urls: List of the URLs that failed to download or couldn't be parsed (e.g. a URL that isn't a profile page). Profile URLs can be tried again with scrape_urls - for anything else (e.g. a category page), run the scrape again.
+    """
+
+    def __init__(self, profiles=(), failed_urls=()):
+        super().__init__(profiles)
+        self.failed_urls = list(failed_urls)
+
+    def to_table(self):
+        """
+        Get the profiles as a ProfileTable, for exporting them all at once (CSV, NDJSON, Arrow, Parquet).
+
+        :return: A ProfileTable of the profiles.
+        """
+        from cnw_scraper.table import ProfileTable
+        return ProfileTable.from_profiles(self)
@@ -0,0 +1,113 @@
+# ---------- Streaming reader for the site's XML sitemaps
+
+import re
+import zlib
+from datetime import datetime,timedelta,timezone
+from xml.etree.ElementTree import XMLPullParser
+from cnw_scraper.base_functions import _RETRY_STATUSES,_retry_after,closing,retrying
+from cnw_scraper.logs import Logs
+from cnw_scraper.options import Options as opt
+
+_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+_CHUNK_SIZE = 65536
+# W3C datetime, in any of its precisions: YYYY, YYYY-MM, YYYY-MM-DD, then hh:mm, hh:mm:ss or hh:mm:ss.s with an optional timezone
+_W3C_DATETIME = re.compile(r"(\d{4})(?:-(\d{2})(?:-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d+))?)?(Z|[+-]\d{2}:?\d{2})?)?)?)?$")
+
+def _parse_w3c(value):
+    # Turn a W3C datetime string into a datetime (missing parts are the start of the period, e.g. '2024-06' is June 1st). Raises ValueError if it isn't one.
+    match = _W3C_DATETIME.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid date/time: {value!r}")
+    year,month,day,hour,minute,second,fraction,zone = match.groups()
+    tz = None
+    if zone:
+        offset = 0 if zone == "Z" else int(zone[1:3])*60+int(zone[-2:])
+        tz = timezone(timedelta(minutes=-offset if zone[0] == "-" else offset))
+    microsecond = int((fraction or "0")[:6].ljust(6,"0"))
+    return datetime(int(year),int(month or 1),int(day or 1),int(hour or 0),int(minute or 0),int(second or 0),microsecond,tz)
+
+def to_datetime(value):
+    # Turn a sitemap lastmod (W3C datetime string of any precision), date or datetime into an aware datetime for comparing. Times without a timezone are taken as UTC. Raises ValueError for a string that isn't a date.
+    if isinstance(value,str):
+        value = _parse_w3c(value)
+    if not isinstance(value,datetime):
+        value = datetime(value.year,value.month,value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def is_profile_url(url):
+    # Profile pages are the ones that end with '-net-worth/'
+    return url.rstrip("/").endswith("-net-worth")
+
+def _lastmod(value):
+    # A lastmod as a datetime, or None if it's missing or can't be read (those entries are never filtered out)
+    try:
+        return to_datetime(value) if value else None
+    except ValueError:
+        Logs._log("Unreadable lastmod in sitemap: %r",value,is_verbose=True)
+        return None
+
+async def _open(url,session):
+    # Start a GET request, retrying it like fetch does. The response is returned unread (so it can be streamed) and has to be released.
+    async def request():
+        response = await session.request(method="GET", url=url, timeout=opt._timeout())
+        if response.status in _RETRY_STATUSES:
+            response.release()
+        return response,response.status,_retry_after(response.headers.get("Retry-After")) if response.status in [429,503] else None
+    return await retrying(url,request)
+
+async def find_sitemaps(session):
+    # Get the sitemap URLs listed in the site's robots.txt, or the usual sitemap location if there aren't any
+    sitemaps = []
+    response = await _open(opt._SITE_URL+"/robots.txt",session)
+    try:
+        if response.status < 400:
+            for line in (await response.text()).splitlines():
+                if line.lower().startswith("sitemap:"):
+                    sitemaps.append(line.split(":",1)[1].strip())
+    finally:
+        response.release()
+    return sitemaps or [opt._SITE_URL+"/sitemap.xml"]
+
+async def stream_entries(url,session):
+    # Yield ('sitemap'|'url', loc, lastmod) for each entry of a sitemap while it downloads. The XML is parsed in chunks and each entry is thrown away once read, so even huge sitemaps never sit in memory whole.
+    Logs._log("Reading sitemap: %s",url,is_verbose=True,url=url)
+    parser = XMLPullParser(events=["start","end"])
+    unzip = zlib.decompressobj(16+zlib.MAX_WBITS) if url.endswith(".gz") else None
+    root = None
+    async with await _open(url,session) as response:
+        if response.status >= 400:
+            raise Exception(f"Couldn't get sitemap ({response.status}): {url}")
+        async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+            parser.feed(unzip.decompress(chunk) if unzip else chunk)
+            for event,elem in parser.read_events():
+                if event == "start":
+                    if root is None: root = elem
+                    continue
+                if elem.tag in [_NS+"url",_NS+"sitemap"]:
+                    loc = elem.findtext(_NS+"loc")
+                    lastmod = elem.findtext(_NS+"lastmod")
+                    root.clear()
+                    if loc:
+                        yield elem.tag[len(_NS):],loc.strip(),lastmod.strip() if lastmod else None
+    parser.close()
+
+async def stream_profile_urls(session,since=None,sitemap_urls=None):
+    # Yield (URL, lastmod) of every profile in the sitemaps, going into sitemap indexes as they come up. With 'since', profiles (and whole child sitemaps) last modified before then are skipped. A child sitemap that can't be read (even after retries) is logged and skipped, so one bad sitemap doesn't end the whole stream.
+    since = to_datetime(since) if since else None
+    for sitemap_url in sitemap_urls or await find_sitemaps(session):
+        async with closing(stream_entries(sitemap_url,session)) as entries:
+            async for kind,loc,lastmod in entries:
+                modified = _lastmod(lastmod) if since else None
+                too_old = modified is not None and modified < since
+                if kind == "sitemap":
+                    if not too_old:
+                        try:
+                            async with closing(stream_profile_urls(session,since,[loc])) as child_entries:
+                                async for entry in child_entries:
+                                    yield entry
+                        except Exception as err:
+                            Logs._log("FAILED: Skipping sitemap (%s) - %s",err,loc,url=loc,error=str(err))
+                elif is_profile_url(loc) and not too_old:
+                    yield loc,lastmod
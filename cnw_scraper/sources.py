@@ -0,0 +1,84 @@
+import cnw_scraper.base_functions as bf
+from cnw_scraper.categories import Category
+from cnw_scraper.client import current_session
+from cnw_scraper.locations import Location
+
+class Source:
+    """
+    A place to get profiles from, for scrape_sources. This object isn't created directly, but rather through its category, map, top, names and urls methods, which take the same arguments as the matching scrape_* functions. E.g. -
+
+        sources = [Source.top(), Source.map(Location.NEW_YORK), Source.category(Category.CEOS, 1, 5)]
+
+    :label: The name the source goes by in each Profile's sources list. Defaults to something like 'category:CEOS' - pass your own to any of the methods to change it.
+    """
+
+    def __init__(self, label:str, collect):
+        self.label = label
+        self._collect = collect
+
+    def __repr__(self):
+        return f"Source({self.label!r})"
+
+    @classmethod
+    def category(cls,category:Category,starting_page:int=1,ending_page:int=0,label:str=""):
+        """
+        The profiles of a category within a page range (see scrape_category).
+
+        :return: A Source object.
+        """
+        if not isinstance(category,Category):
+            raise Exception("Invalid Category Parameter.")
+        async def collect(failed_urls):
+            start = max(starting_page,1)
+            end = await bf.find_last_page(category,current_session()) if ending_page == "auto" else ending_page
+            return await bf.collect_links(bf.category_urls(category,start,max(start,end)),"post_listing",failed_urls)
+        return cls(label or f"category:{category.name}",collect)
+
+    @classmethod
+    def map(cls,location:Location,label:str=""):
+        """
+        The profiles of a location on the site's map (see scrape_map).
+
+        :return: A Source object.
+        """
+        if not isinstance(location,Location):
+            raise Exception("Invalid Location Parameter")
+        async def collect(failed_urls):
+            return await bf.collect_links([bf.map_url(location)],"cnwMaps_mainProfileList",failed_urls)
+        return cls(label or f"map:{location.name}",collect)
+
+    @classmethod
+    def top(cls,category:Category=None,label:str=""):
+        """
+        The profiles of a top list (see scrape_top).
+
+        :return: A Source object.
+        """
+        top_url = bf.top_url(category)
+        async def collect(failed_urls):
+            return await bf.collect_links([top_url],"top_100_list",failed_urls)
+        return cls(label or (f"top:{category.name}" if category else "top"),collect)
+
+    @classmethod
+    def names(cls,names:list,label:str="names"):
+        """
+        The profiles that match the names in a search (see scrape_names).
+
+        :return: A Source object.
+        """
+        names = list(names)
+        async def collect(failed_urls):
+            return await bf.collect_searches(names,failed_urls)
+        return cls(label,collect)
+
+    @classmethod
+    def urls(cls,urls:list,label:str="urls"):
+        """
+        Profile page URLs you already have (see scrape_urls).
+
+        :return: A Source object.
+        """
+        urls = list(urls)
+        async def collect(failed_urls):
+            return urls
+        return cls(label,collect)
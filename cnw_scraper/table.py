@@ -0,0 +1,172 @@
+import csv
+import json
+from cnw_scraper.profile import _description_text
+
+# Columns of a table, with the stat each one comes from (None for the ones that come from the profile's typed fields)
+COLUMNS = {
+    "name":None,
+    "net_worth":None,
+    "salary":"Salary",
+    "birth_date":None,
+    "gender":"Gender",
+    "height":None,
+    "profession":"Profession",
+    "nationality":"Nationality",
+    "last_updated":None,
+    "url":None,
+    "description":None,
+}
+# Arrow type of each column (strings for the rest)
+_ARROW_TYPES = {
+    "net_worth":"int64",
+    "birth_date":"date32",
+    "height":"float64",
+    "last_updated":"date32",
+}
+
+def _row(profile,columns):
+    # A profile's value for each of the given columns, in order
+    return [getattr(profile,name) if COLUMNS[name] is None else profile.stats.get(COLUMNS[name]) for name in columns]
+
+def _stored_description(profile):
+    # A profile's description as the table keeps it: the text if it's been read, otherwise its compressed HTML along with the parser to read it with
+    return profile._description if profile._description is not None else (profile._description_html,profile._parser)
+
+def _iso(column):
+    # Dates as ISO strings (e.g. '1964-01-12'), for the text formats
+    return [value.isoformat() if value else value for value in column]
+
+class ProfileTable:
+    """
+    A batch of profiles stored as columns (one list per field) instead of one object per profile, for exporting a big scrape in one go. Get one from ProfileList.to_table, or build one straight from a stream of profiles so they never all sit in memory as objects. E.g. -
+
+        table = ProfileTable.from_profiles(iter_category(Category.ACTORS, 1, 300))
+        table.to_parquet("./actors.parquet")
+
+    Net worth is an integer, dates are datetime.date objects, height is in meters and missing values are None. The other stats listed in Profile.fields are kept as strings. Descriptions that haven't been read yet stay compressed HTML until something needs them as text (the description column, to_arrow/to_parquet, or to_csv/to_ndjson with include_description), so a table exported without them never parses them.
+
+    Note: to_arrow and to_parquet need pyarrow, which isn't installed with this package - use 'pip install cnw_scraper[arrow]' to get it.
+
+    :columns: Static class attribute. The names of the table's columns, in order.
+    """
+    columns = list(COLUMNS)
+
+    def __init__(self):
+        self._columns = {name:[] for name in COLUMNS}
+
+    def __len__(self):
+        return len(self._columns["name"])
+
+    @classmethod
+    def from_profiles(cls,profiles):
+        """
+        Make a table out of profiles.
+
+        :profiles: An iterable of Profile objects, e.g. a ProfileList or an iter_* function.
+
+        :return: A ProfileTable with a row for each profile.
+        """
+        table = cls()
+        for profile in profiles:
+            table.append(profile)
+        return table
+
+    def append(self,profile):
+        """
+        Add a profile to the end of the table.
+
+        :profile: The Profile object to add.
+
+        :return: None.
+        """
+        names = self.columns[:-1]
+        for name,value in zip(names,_row(profile,names)):
+            self._columns[name].append(value)
+        self._columns["description"].append(_stored_description(profile))
+
+    def column(self,name:str):
+        """
+        Get all of the values of a column.
+
+        :name: One of the names in ProfileTable.columns.
+
+        :return: A list with the column's value for each row.
+        """
+        if name not in self._columns:
+            raise Exception(f"Invalid column '{name}' - use one of: {', '.join(COLUMNS)}.")
+        if name == "description":
+            return self._descriptions()
+        return self._columns[name]
+
+    def _descriptions(self):
+        # The description column as text - the descriptions that haven't been read yet are read now, and kept as text from then on
+        values = self._columns["description"]
+        for i,value in enumerate(values):
+            if isinstance(value,tuple):
+                values[i] = _description_text(*value)
+        return values
+
+    def _text_columns(self,include_description=True):
+        # The columns ready to be written out as text, with or without the descriptions
+        names = self.columns if include_description else self.columns[:-1]
+        columns = {name:self._descriptions() if name == "description" else self._columns[name] for name in names}
+        return names,[_iso(values) if _ARROW_TYPES.get(name) == "date32" else values for name,values in columns.items()]
+
+    def to_csv(self,file_path:str,include_description:bool=True):
+        """
+        Write the table to a CSV file, with the column names as the header row. Missing values are left empty.
+
+        :file_path: Path of the file to write (overwritten if it's there).
+
+        :include_description: Whether to write the description column (they are long).
+
+        :return: None.
+        """
+        names,values = self._text_columns(include_description)
+        with open(file_path,"w",newline="",encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*values))
+
+    def to_ndjson(self,file_path:str,include_description:bool=True):
+        """
+        Write the table to a newline-delimited JSON file, with one object per profile. Missing values are null.
+
+        :file_path: Path of the file to write (overwritten if it's there).
+
+        :include_description: Whether to write the description field (they are long).
+
+        :return: None.
+        """
+        names,values = self._text_columns(include_description)
+        # The keys only need encoding once, then each line is put together out of them
+        keys = ["{"+json.dumps(names[0])+":"]+[","+json.dumps(name)+":" for name in names[1:]]
+        with open(file_path,"w",encoding="utf-8") as f:
+            for row in zip(*values):
+                f.write("".join(key+json.dumps(value) for key,value in zip(keys,row))+"}\n")
+
+    def to_arrow(self):
+        """
+        Get the table as a pyarrow Table, with typed columns (int64 net worth, date32 dates, float64 height, strings for the rest). Needs pyarrow.
+
+        :return: A pyarrow.Table.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise Exception("pyarrow isn't installed - use 'pip install cnw_scraper[arrow]' to get it.")
+        return pa.table({name:pa.array(self.column(name),type=getattr(pa,_ARROW_TYPES.get(name,"string"))()) for name in self.columns})
+
+    def to_parquet(self,file_path:str,compression:str="zstd"):
+        """
+        Write the table to a Parquet file. Needs pyarrow.
+
+        :file_path: Path of the file to write (overwritten if it's there).
+
+        :compression: Compression codec to use, e.g. 'zstd', 'snappy', 'gzip' or 'none'.
+
+        :return: None.
+        """
+        table = self.to_arrow()
+        import pyarrow.parquet as pq
+        pq.write_table(table,file_path,compression=compression)
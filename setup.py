@@ -29,5 +29,10 @@ setup(
         "typing-extensions==3.10.0.0",
         "yarl==1.6.3",
     ],
+    extras_require={
+        "arrow":["pyarrow"],
+        "lxml":["lxml"],
+        "selectolax":["selectolax"],
+    },
     python_requires='>=3.8'
 )
\ No newline at end of file
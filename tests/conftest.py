@@ -0,0 +1,23 @@
+# ---------- Shared setup for the tests
+#
+# Makes the package and the benchmarks' stand-in server importable, and loads the pages in benchmarks/fixtures/ (synthetic pages with the site's markup - see the README there). Run from the repo root:
+#
+#   python -m pytest -q
+
+import glob
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..")
+FIXTURES = os.path.join(ROOT,"benchmarks","fixtures")
+
+sys.path.insert(0,ROOT)
+sys.path.insert(0,os.path.join(ROOT,"benchmarks"))
+
+def fixture_names(pattern):
+    # File names of the fixture pages matching a pattern, e.g. 'profile_*.html'
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(FIXTURES,pattern)))
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES,name),encoding="utf-8") as f:
+        return f.read()
@@ -0,0 +1,52 @@
+# ---------- Parser backend equivalence
+#
+# Every installed parser backend has to pull exactly the same data out of the fixture pages as 'html.parser' (the one that's always there) does. The fixtures are synthetic, so this only covers the markup listed in benchmarks/fixtures/README.md.
+
+import pytest
+from conftest import fixture_names,load_fixture
+from cnw_scraper import parsers
+from cnw_scraper.base_functions import parse_profile
+
+BACKENDS = parsers.available_parsers()
+
+def profile_data(html,include_description,parser):
+    # What parse_profile gets out of a profile page, as plain data that can be compared
+    profile = parse_profile(html,include_description,parser)
+    return dict(profile.stats),profile.description
+
+def listing_target(html):
+    # The id of the profile list inside a listing page
+    for target_id in ["post_listing","cnwMaps_mainProfileList","top_100_list"]:
+        if f'id="{target_id}"' in html:
+            return target_id
+    raise Exception("Listing page has no known profile list in it.")
+
+@pytest.mark.parametrize("name",fixture_names("profile_*.html"))
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_profile_stats(backend,name):
+    html = load_fixture(name)
+    assert parse_profile(html,False,backend).stats == parse_profile(html,False,"html.parser").stats
+
+@pytest.mark.parametrize("name",fixture_names("profile_*.html"))
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_profile_description(backend,name):
+    html = load_fixture(name)
+    assert profile_data(html,True,backend) == profile_data(html,True,"html.parser")
+
+@pytest.mark.parametrize("name",fixture_names("listing_*.html"))
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_profile_links(backend,name):
+    html = load_fixture(name)
+    target_id = listing_target(html)
+    links = parsers.profile_links(html,target_id,backend)
+    assert links and links == parsers.profile_links(html,target_id,"html.parser")
+
+@pytest.mark.parametrize("name",fixture_names("search_*.html"))
+@pytest.mark.parametrize("backend",BACKENDS)
+def test_search_lead(backend,name):
+    html = load_fixture(name)
+    assert parsers.search_lead(html,backend) == parsers.search_lead(html,"html.parser")
+
+def test_fixtures_found():
+    # Guards against the tests above quietly running over nothing
+    assert fixture_names("profile_*.html") and fixture_names("listing_*.html") and fixture_names("search_*.html")
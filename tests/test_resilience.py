@@ -0,0 +1,88 @@
+# ---------- Resilience
+#
+# Runs the scrape functions against the benchmarks' stand-in server (see benchmarks/server.py) while it misbehaves - outages, throttling, errors - and checks that nothing gets lost that shouldn't. Nothing goes over the network.
+
+import pytest
+from datetime import datetime,timedelta,timezone
+import cnw_scraper as cnw
+import cnw_scraper.base_functions as bf
+from cnw_scraper import sitemap
+from server import StandInServer
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer(category_pages=40) as server:
+        yield server
+
+@pytest.fixture
+def site(server,monkeypatch):
+    # The stand-in server, with the scraper pointed at it, quick retries and nothing remembered from other tests
+    monkeypatch.setattr(cnw.Options,"_SITE_URL",server.url)
+    monkeypatch.setattr(cnw.Options,"retry_backoff",0.05)
+    monkeypatch.setattr(cnw.Options,"circuit_breaker_cooldown",0.5)
+    for remembered in [bf._searches,bf._last_pages,bf._breakers]:
+        remembered.clear()
+    yield server
+    server._failing.clear()
+
+def test_page_count_throttled(site):
+    # Throttling while probing for a category's last page shouldn't be taken for the end of the category
+    site.fail_path("/category/actors/page/8/",1,429,0)
+    assert cnw.find_last_page(cnw.Category.ACTORS) == site.category_pages
+
+def test_page_count_failing(site):
+    # A page that keeps failing raises instead of being guessed to be missing
+    site.fail_path("/category/actors/page/8/",100,503,0)
+    with pytest.raises(Exception,match="Couldn't get"):
+        cnw.find_last_page(cnw.Category.ACTORS)
+
+def test_page_count_capped(site,monkeypatch):
+    # A site that answers every page (e.g. by redirecting out-of-range ones) doesn't keep the probing going forever
+    probes = []
+    async def probe(url,session):
+        probes.append(url)
+        return True
+    monkeypatch.setattr(bf,"probe",probe)
+    with pytest.raises(Exception,match="last page can't be found"):
+        cnw.find_last_page(cnw.Category.ACTORS)
+    assert len(probes) == 15
+
+
+def test_sitemap_broken_child(site):
+    # A child sitemap that fails once gets tried again, and one that keeps failing is skipped without ending the stream
+    site.fail_path("/post-sitemap2.xml",1,503,0)
+    site.fail_path("/post-sitemap4.xml",100,503,0)
+    assert len(list(cnw.iter_sitemap("2023-06"))) == site.sitemap_size-1000
+
+@pytest.mark.parametrize("value,expected",[
+    ("2023",datetime(2023,1,1,tzinfo=timezone.utc)),
+    ("2023-06",datetime(2023,6,1,tzinfo=timezone.utc)),
+    ("2023-06-15",datetime(2023,6,15,tzinfo=timezone.utc)),
+    ("2023-06-15T08:30Z",datetime(2023,6,15,8,30,tzinfo=timezone.utc)),
+    ("2023-06-15T08:30:05+02:00",datetime(2023,6,15,8,30,5,tzinfo=timezone(timedelta(hours=2)))),
+    ("2023-06-15T08:30:05.25-0500",datetime(2023,6,15,8,30,5,250000,tzinfo=timezone(timedelta(hours=-5)))),
+])
+def test_lastmod_precision(value,expected):
+    assert sitemap.to_datetime(value) == expected
+
+def test_lastmod_unreadable():
+    # Junk can't be compared, so the entry is kept instead of failing the stream
+    with pytest.raises(ValueError):
+        sitemap.to_datetime("last tuesday")
+    assert sitemap._lastmod("last tuesday") is None
+
+def test_outage(site):
+    # A burst of 503s long enough to open the circuit breaker shouldn't fail the pages queued behind it - they wait for the cooldown and get tried again
+    urls = [f"{site.url}/richest-celebrities/person-{i}-net-worth/" for i in range(2000)]
+    site.start_outage(10)
+    profiles = cnw.scrape_urls(urls)
+    assert len(profiles) == len(urls) and not profiles.failed_urls
+
+@pytest.mark.parametrize("parse_workers",[0,2])
+def test_unparseable_page(site,monkeypatch,parse_workers):
+    # A page that downloads but isn't a profile page fails on its own, instead of taking the rest of the batch down with it
+    monkeypatch.setattr(cnw.Options,"parse_workers",parse_workers)
+    urls = [f"{site.url}/richest-celebrities/person-{i}-net-worth/" for i in range(50)]+[f"{site.url}/map/asia/"]
+    profiles = cnw.scrape_urls(urls)
+    assert len(profiles) == 50 and profiles.failed_urls == [urls[-1]]
+    assert len(list(cnw.iter_urls(urls))) == 50